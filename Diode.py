@@ -1,8 +1,8 @@
 from pigpio import *
 import time
-import yaml
-import numpy as np
-import time
+import settings
+from selectPin import SelectPin
+from i2cPool import pool
 
 class Diode:
     """Diode class.
@@ -25,26 +25,36 @@ class Diode:
         - multiplication factor (multiply_factor)
         - multiplication factor string (multiply_factor_string) [used because value is float and string is 'multiply'/'NDx'/float]
 
-    Constructor takes: ADC address, I/O Expander address.
+    Attributes are fixed (__slots__), a Diode keeps no per-instance dict. Connection to pigpio daemon is opened by the first
+    set_i2c() call, calibration and config are not copied, all Diodes refer to the same parsed files (see settings.load_cached).
+    I2C handles are shared by Diodes of the same port (see i2cPool.I2cPool) and released by close().
+
+    Each I2C bus has its own pigpio connection, Diodes on different buses can be read from different threads. Diodes on one bus
+    must be read from the same thread.
+
+    Constructor takes: ADC address, I/O Expander address, I2C bus (optional), adc_sel GPIO (optional).
 
     Example: d0 = Diode.Diode(0x48, 0x38)
+             d4 = Diode.Diode(0x48, 0x38, bus=3, sel_pin=27)
     """
     
-    rpi = pi()
+    __slots__ = ('name', 'adc_add', 'io_add', 'bus', 'select', 'rpi', 'hiic1', 'hiic2', 'amp_bit_dg408', 'power_read', 'power_unit',
+                 'not_set', 'auto_range', 'readcount', 'overexposed', 'underexposed', 'active', 'wasactive', 'wavelength', 'offset',
+                 'multiply_factor', 'multiply_factor_string', 'voltage_address', 'calibration', 'config', 'serviceMode', 'voltage',
+                 'read_power')
+
+    shared_rpi = None  # pigpio connection used for all buses if set (e.g. simulator.SimulatedPi), see connect()
+    connections = {}  # bus -> pigpio connection
 
     diodeCount = 0
-    not_set = True
     int_ref_adc = 2.048
     thresh_up = 1.8
     thresh_down = 0.3
     units = ['W', 'mW', 'uW', 'nW', 'pW']
     delay = 0.040
-
-    file = open('calibration.yaml')
-    caldata = yaml.load(file, Loader=yaml.FullLoader)
-    file.close()
-
-    specific_wavelengths = caldata['calibrated wavelengths']
+    max_settle_reads = 10  # voltage address reads until it is stable
+    max_range_steps = 16  # amplification changes of one auto range read
+    transfer_time = 0.1  # [s] for the I2C transfers of one read, added to read_time()
 
     # START
     # pin definitions
@@ -66,10 +76,15 @@ class Diode:
     D0_TCA_OUT_REG = 0x01
     # END
 
-    def __init__(self, adc_add=0x00, tca_add=0x00):
+    def __init__(self, adc_add=0x00, tca_add=0x00, bus=BUS, sel_pin=adc_sel_pin):
         self.name = ''
         self.adc_add = adc_add
         self.io_add = tca_add
+        self.bus = bus
+        self.select = SelectPin.get(sel_pin)
+        self.rpi = None
+        self.hiic1 = None
+        self.hiic2 = None
         self.amp_bit_dg408 = 0x00
         self.power_read = 0.
         self.power_unit = 'W'
@@ -85,11 +100,39 @@ class Diode:
         self.multiply_factor = 1
         self.multiply_factor_string = 'apply filter'
         self.voltage_address = 2.048
-        self.calibration = []
-        self.config = []
+        self.calibration = None  # shared calibration file, set when a photodiode is connected
+        self.config = None  # shared config file
         self.serviceMode = False
         self.voltage = 0.
+        self.read_power = False
         Diode.diodeCount += 1
+
+    @staticmethod
+    def connect(bus=BUS):
+        """Connects to pigpio daemon, once per I2C bus.
+
+        pigpio executes the commands of one connection one after another, so ports on different buses get their own connection
+        and can be read in parallel."""
+        if Diode.shared_rpi is not None:
+            return Diode.shared_rpi
+        if bus not in Diode.connections:
+            Diode.connections[bus] = pi()
+        return Diode.connections[bus]
+
+    @staticmethod
+    def read_time():
+        """Returns the longest duration [s] of a read: settling of the voltage address and a full auto range sweep.
+
+        Used as deadline of port operations (see portGuard.PortGuard), a read that takes longer is stuck."""
+        return (Diode.max_settle_reads + 1) * 0.01 + Diode.max_range_steps * Diode.delay + Diode.transfer_time
+
+    @staticmethod
+    def disconnect():
+        """Closes all I2C handles and pigpio connections, e.g. on shutdown."""
+        pool.close_all()
+        for rpi in Diode.connections.values():
+            rpi.stop()
+        Diode.connections.clear()
         
     def get_name(self):
         return self.name
@@ -149,13 +192,11 @@ class Diode:
         self.serviceMode = mode
 
     def set_name(self):
-        file = open('config.yaml', 'r')
-        self.config = yaml.load(file, Loader=yaml.FullLoader)
-        file.close()
+        self.config = settings.load_cached('config.yaml')  # parsed again only when the file changes
         if self.active:
             try:
                 self.name = self.config['diodes'][f'd{round(self.voltage_address, 1):.1f}']['name']
-            except:
+            except KeyError:  # photodiode is not in config
                 return
         else:
             self.is_active()
@@ -164,7 +205,7 @@ class Diode:
         """Manually sets amplification. Disables auto range function."""
         self.amp_bit_dg408 = amp
         self.auto_range = False
-        Diode.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_OUT_REG, self.amp_bit_dg408)
+        self.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_OUT_REG, self.amp_bit_dg408)
         time.sleep(Diode.delay)
 
     def set_wavelength(self, wave_val):
@@ -187,38 +228,41 @@ class Diode:
         return False
 
     def choose_source(self, source):
-        """Writes appropriate value to the adc_sel (GPIO17) pin in order to choose between diode selection or."""
+        """Writes appropriate value to the adc_sel (GPIO17) pin in order to choose between diode selection or.
+
+        Pin may be shared with ports on other buses, reads hold it with self.select.hold() instead."""
         # source = True
         
         if source:
-            Diode.rpi.write(Diode.adc_sel_pin, True)
+            self.rpi.write(self.select.gpio, True)
             self.read_power = False
         
         else:
-            Diode.rpi.write(Diode.adc_sel_pin, False)
+            self.rpi.write(self.select.gpio, False)
             self.read_power = True
+        self.select.forget()
         
         return
 
-    def is_active(self):
-        """Checks if a photodiode is connected. Updates name."""
+    def is_active(self, deadline=None):
+        """Checks if a photodiode is connected. Updates name.
+
+        Raises TimeoutError if time.monotonic() passes deadline, I2C errors are raised as they are."""
 
         activity = False
-        self.read_voltage_add()
-        self.choose_source(True)
+        with self.select.hold(self.rpi, True):  # voltage address
+            self.read_voltage_add(deadline)
 
         if self.voltage_address < 2.0 and self.voltage_address >= 0.0:                  
             self.active = True
 
-            if not self.wasactive:                
-                file = open('calibration.yaml', 'r')
-                self.calibration = yaml.load(file, Loader=yaml.FullLoader)
-                file.close()
+            if not self.wasactive:
+                self.calibration = settings.load_cached('calibration.yaml')
 
             try:
                 self.set_name()
-            except:
-                pass
+            except OSError as e:
+                print('An error occurred while loading config:', e)
             self.wasactive = self.active
             activity = True
         
@@ -232,20 +276,46 @@ class Diode:
         return activity
 
     def set_i2c(self):
-        """Initializes I2C protocol for two I2C devices: ADC and I/O Expander with addresses given to constructor."""
+        """Initializes I2C protocol for two I2C devices: ADC and I/O Expander with addresses and bus given to constructor."""
         if self.not_set:
-            Diode.rpi.set_mode(Diode.adc_sel_pin, OUTPUT)
-            Diode.rpi.write(Diode.adc_sel_pin, False)
-
-            self.hiic1 = Diode.rpi.i2c_open(Diode.BUS, self.adc_add)
-            self.hiic2 = Diode.rpi.i2c_open(Diode.BUS, self.io_add)   
-            if self.hiic1 >= 0:         
-                Diode.rpi.i2c_write_i2c_block_data(self.hiic1, Diode.D0_ADC_CONF_REG, [0x84, 0xC3])
-                Diode.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_CONF_REG, 0x00)  
-                Diode.rpi.i2c_write_byte(self.hiic1, Diode.D0_ADC_CONV_REG)
+            self.rpi = Diode.connect(self.bus)
+            self.rpi.set_mode(self.select.gpio, OUTPUT)
+            self.rpi.write(self.select.gpio, False)
+            self.select.forget()
 
+            # handles are taken from the pool, a port that was set up before reuses its handles
+            self.hiic1 = pool.acquire(self.rpi, self.bus, self.adc_add)
+            try:
+                self.hiic2 = pool.acquire(self.rpi, self.bus, self.io_add)
+            except OSError:
+                pool.release(self.bus, self.adc_add)
+                raise
             self.not_set = False
 
+            try:
+                self.rpi.i2c_write_i2c_block_data(self.hiic1, Diode.D0_ADC_CONF_REG, [0x84, 0xC3])
+                self.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_CONF_REG, 0x00)  
+                self.rpi.i2c_write_byte(self.hiic1, Diode.D0_ADC_CONV_REG)
+            except Exception:  # port is left out by create_diodes, its handles must not stay open
+                self.close()
+                raise
+
+    def reopen(self):
+        """Opens I2C handles again (e.g. after bus errors) and sets up the ADC and the I/O Expander again."""
+        self.hiic1 = pool.reopen(self.bus, self.adc_add)
+        self.hiic2 = pool.reopen(self.bus, self.io_add)
+
+        self.rpi.i2c_write_i2c_block_data(self.hiic1, Diode.D0_ADC_CONF_REG, [0x84, 0xC3])
+        self.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_CONF_REG, 0x00)
+        self.rpi.i2c_write_byte(self.hiic1, Diode.D0_ADC_CONV_REG)
+
+    def close(self):
+        """Releases I2C handles of the ADC and I/O Expander, set_i2c() opens them again."""
+        if not self.not_set:
+            pool.release(self.bus, self.adc_add)
+            pool.release(self.bus, self.io_add)
+            self.not_set = True
+
     def change_amp(self, fact):
         """Writes to I/O Expander in order to change voltage amplification in circuit.
         
@@ -281,26 +351,39 @@ class Diode:
     
         return 0
 
-    def read_voltage_add(self):
-        """Reads voltage address on a photodiode."""
+    def check_deadline(self, deadline, operation):
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f'{operation} of ADC {hex(self.adc_add)} on bus {self.bus} took too long')
 
-        while True:
+    def read_adc(self):
+        """Reads conversion register of the ADC. Returns voltage [V]. Raises OSError if the ADC does not answer."""
+        (c, data) = self.rpi.i2c_read_device(self.hiic1, 2)
+        if c < 2:
+            raise OSError(f'ADC {hex(self.adc_add)} on bus {self.bus} did not answer ({c})')
+        return Diode.int_ref_adc * (int.from_bytes(data, 'big', signed=True) / ((2**15) - 1))
+
+    def read_voltage_add(self, deadline=None):
+        """Reads voltage address on a photodiode. Raises TimeoutError if it does not settle in max_settle_reads reads or by deadline."""
+
+        for _ in range(Diode.max_settle_reads):
             
             volt = self.voltage_address
 
-            self.choose_source(True)
             time.sleep(0.01)
         
-            (c, data) = Diode.rpi.i2c_read_device(self.hiic1, 2)        
-            self.voltage_address = Diode.int_ref_adc * (int.from_bytes(data, 'big', signed=True) / ((2**15) - 1))     
+            self.voltage_address = self.read_adc()
 
             if (self.voltage_address - volt) <= (self.voltage_address*0.05):
-                break
+                return
+
+            self.check_deadline(deadline, 'voltage address read')
 
-        return 
+        raise TimeoutError(f'voltage address of ADC {hex(self.adc_add)} on bus {self.bus} did not settle')
 
-    def read_data_adc(self):
-        """Reads data through I2C protocol from A/D Converter with address given to the constructor."""
+    def read_data_adc(self, deadline=None):
+        """Reads data through I2C protocol from A/D Converter with address given to the constructor.
+
+        Raises TimeoutError if time.monotonic() passes deadline or auto range does not settle in max_range_steps steps."""
 
         """ Data conversion to Christianity: """
         def convert_the_data(data):
@@ -313,10 +396,12 @@ class Diode:
                 current = self.voltage / self.config['resistors'][f'{self.amp_bit_dg408}']
 
                 self.power_read = current * 1/(self.calibration['diodes'][f'{self.name}']['response'][self.wavelength - 350])
-                if self.wavelength in Diode.specific_wavelengths:
+                if self.wavelength in self.calibration['calibrated wavelengths']:
                     self.power_read = self.calibration['diodes'][f'{self.name}']['specific corrections'][f'{self.wavelength}'] * self.power_read
 
-                self.power_read = 2 * self.multiply_factor * self.calibration['diode ports'][f'{hex(self.adc_add)}'] * self.calibration['amplificaton calibration'][f'{self.amp_bit_dg408}'] * self.power_read
+                # ports without a correction in calibration file (e.g. added channels) are not corrected
+                port_correction = self.calibration['diode ports'].get(f'{hex(self.adc_add)}', 1)
+                self.power_read = 2 * self.multiply_factor * port_correction * self.calibration['amplificaton calibration'][f'{self.amp_bit_dg408}'] * self.power_read
 
                 if self.multiply_factor > 0 and not self.power_read == 0:
                     ratio_pow = 1 / self.power_read
@@ -350,59 +435,63 @@ class Diode:
         if not self.name == '':
             """ Is the diode still active? """
 
-            if self.is_active():
-                self.choose_source(False)
-                time.sleep(0.01)
+            if self.is_active(deadline):
+                # photodiode signal, ports on other buses may read theirs meanwhile (see selectPin.SelectPin)
+                with self.select.hold(self.rpi, False):
+                    time.sleep(0.01)
 
-                ex = 0
+                    ex = 0
 
-                """ Setting thresholds, reading the data, adjusting the amplification. """
+                    """ Setting thresholds, reading the data, adjusting the amplification. """
 
-                if self.amp_bit_dg408 == 0x07:
-                    lower_limit = 0.0
-                else:
-                    lower_limit = Diode.thresh_down
+                    if self.amp_bit_dg408 == 0x07:
+                        lower_limit = 0.0
+                    else:
+                        lower_limit = Diode.thresh_down
 
-                if self.amp_bit_dg408 == 0x00:
-                    upper_limit = 2.048
-                else:
-                    upper_limit = Diode.thresh_up
+                    if self.amp_bit_dg408 == 0x00:
+                        upper_limit = 2.048
+                    else:
+                        upper_limit = Diode.thresh_up
 
-                while True:
+                    for _ in range(Diode.max_range_steps):
+                        self.check_deadline(deadline, 'signal read')
                     
-                    Diode.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_OUT_REG, self.amp_bit_dg408)
-                    time.sleep(Diode.delay)
+                        self.rpi.i2c_write_byte_data(self.hiic2, Diode.D0_TCA_OUT_REG, self.amp_bit_dg408)
+                        time.sleep(Diode.delay)
                     
-                    (c, data) = Diode.rpi.i2c_read_device(self.hiic1, 2)        
-                    read_voltage = Diode.int_ref_adc * (int.from_bytes(data, 'big', signed=True) / ((2**15) - 1))
+                        read_voltage = self.read_adc()
                     
-                    if self.auto_range:
-                        if read_voltage > upper_limit:
-                            ex = self.change_amp(False)
-                            self.underexposed = False
+                        if self.auto_range:
+                            if read_voltage > upper_limit:
+                                ex = self.change_amp(False)
+                                self.underexposed = False
+
+                            elif read_voltage < lower_limit:
+                                ex = self.change_amp(True)
+                                self.overexposed = False
 
-                        elif read_voltage < lower_limit:
-                            ex = self.change_amp(True)
-                            self.overexposed = False
+                            else:
+                                convert_the_data(read_voltage)
+                                break
 
+                            if ex == 1:
+                                return
+                    
                         else:
+                            if read_voltage > upper_limit: 
+                                self.overexposed = True
+                                self.underexposed = False
+                            elif read_voltage < lower_limit: 
+                                self.underexposed = True
+                                self.overexposed = False
+                            else: 
+                                self.overexposed = False
+                                self.underexposed = False
                             convert_the_data(read_voltage)
                             break
 
-                        if ex == 1:
-                            return
-                    
                     else:
-                        if read_voltage > upper_limit: 
-                            self.overexposed = True
-                            self.underexposed = False
-                        elif read_voltage < lower_limit: 
-                            self.underexposed = True
-                            self.overexposed = False
-                        else: 
-                            self.overexposed = False
-                            self.underexposed = False
-                        convert_the_data(read_voltage)
-                        break
-          
+                        raise TimeoutError(f'auto range of ADC {hex(self.adc_add)} on bus {self.bus} did not settle')
+
         return
@@ -0,0 +1,248 @@
+import concurrent.futures
+import queue
+import threading
+import time
+
+from scheduler import PeriodicSchedule
+from instrumentation import Instrumentation
+from i2cPool import pool
+from portGuard import PortGuard
+from readingSnapshot import ReadingSnapshot, SnapshotBuffer
+
+
+class Sample:
+    """One acquisition cycle of all active ports.
+
+    Attributes: seq (increasing number of the cycle), time (monotonic [s]), wall_time (time.time() [s]),
+    ports (active port indexes), readings (readingSnapshot.ReadingSnapshot, array of all ports that also reads as dict
+    port index -> dict with 'power', 'unit', 'amplification', 'exposure', 'under 10'; active ports that failed are listed by
+    readings.errors()),
+    commands (number of queued commands executed before this cycle), rates (set and achieved rates, see Acquisition.rates).
+    """
+
+    def __init__(self, seq, ports, readings, commands, rates=None):
+        self.seq = seq
+        self.time = time.monotonic()
+        self.wall_time = time.time()
+        self.ports = ports
+        self.readings = readings
+        self.commands = commands
+        self.rates = rates
+
+
+class Acquisition:
+    """Acquisition worker.
+
+    Reads all connected photodiodes at the acquisition rate in a background thread, independently of the display.
+    The newest sample is published in latest, it is replaced as a whole, so readers never see a half-written sample.
+    Its readings are also published in buffer (readingSnapshot.SnapshotBuffer), which other consumers (e.g. servers) poll with
+    buffer.read_if_changed() without ever blocking the acquisition.
+    Samples are handed to on_sample at the logging rate (at most the acquisition rate), so logged rows do not depend on GUI ticks.
+    Cycles run on a deadline-based schedule (see scheduler.PeriodicSchedule), slow cycles are counted as overruns and do not make the rate drift.
+
+    All hardware access happens in this thread. Calls from the GUI that write to the hardware (e.g. manual gain) are queued with submit().
+    Ports on different I2C buses are read in parallel, by one worker thread per bus, so a cycle takes as long as the slowest bus
+    instead of the sum of all ports. Queued calls run while the workers are idle.
+
+    Every port has a PortGuard: its reads have a deadline and are retried, a failing port is quarantined for a cooldown instead
+    of stalling the cycle. It stays among the active ports with its last state and is marked in the readings, so its panel is
+    kept and shows the error. Durations of cycles, diode checks, port reads and logging, and error counts of the ports are recorded
+    in timing (see instrumentation.Instrumentation).
+
+    Constructor takes: diodes (dict port index -> Diode), acquisition rate [Hz], logging rate [Hz], Instrumentation (optional),
+    port errors section of config (optional).
+
+    Example: acquisition = Acquisition({0: d0, 1: d1}, 20, 5)
+             acquisition.on_sample = log_sample
+             acquisition.start()
+    """
+
+    def __init__(self, diodes, rate=10, log_rate=5, timing=None, port_errors=None):
+        self.diodes = diodes
+        self.rate = rate
+        self.log_rate = log_rate
+        self.schedule = PeriodicSchedule(rate)
+        self.timing = Instrumentation() if timing is None else timing
+        self.timing.watch('acq', self.schedule)
+        self.timing.add_counters('i2c handles', pool.metrics)
+        # deadline of a port operation is its longest normal read, unless config sets one
+        self.guards = {port: PortGuard.from_config(port_errors, diode.read_time()) for (port, diode) in diodes.items()}
+        self.timing.add_counters('port errors', self.error_counts)
+        self.autodetect = True
+        self.active_ports = []
+        self.latest = None  # newest Sample
+        self.on_sample = None  # called with a Sample at the logging rate, from the acquisition thread
+        self.seq = 0
+        self.commands = 0
+        self.cycle_interval = None  # moving average of time between cycle starts [s]
+        self._last_cycle = None
+
+        self.size = max(diodes) + 1 if diodes else 0  # rows of a ReadingSnapshot
+        self.buffer = SnapshotBuffer(self.size)  # readings of the newest sample for other consumers
+        self.buses = {}  # I2C bus -> port indexes
+        for (port, diode) in sorted(diodes.items()):
+            self.buses.setdefault(diode.bus, []).append(port)
+        # a single bus is read in the acquisition thread itself
+        self._workers = {bus: concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix=f'bus {bus}')
+                         for bus in self.buses} if len(self.buses) > 1 else {}
+
+        self._commands = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def set_rates(self, rate, log_rate):
+        """Sets acquisition and logging rate [Hz]. Applied on the next cycle."""
+        self.log_rate = log_rate
+        if not rate == self.rate:
+            self.rate = rate
+            self.schedule.set_rate(rate)
+            self.cycle_interval = None
+
+    def rates(self):
+        """Returns dict with set and achieved acquisition and logging rates [Hz].
+
+        Achieved rate is lower than the set one when reading all ports takes longer than a period."""
+        achieved = self.rate if self.cycle_interval is None else min(self.rate, 1 / self.cycle_interval)
+        return {'acquisition rate': self.rate,
+                'achieved acquisition rate': achieved,
+                'logging rate': self.log_rate,
+                'achieved logging rate': min(self.log_rate, achieved)}
+
+    def submit(self, function, *args):
+        """Queues a call that is executed in the acquisition thread before the next cycle."""
+        self._commands.put((function, args))
+
+    def check_diodes(self):
+        """Checks which photodiodes are connected. Returns a list of active port indexes."""
+        active = sorted(port for ports in self._on_buses(self._check_bus) for port in ports)
+        self.active_ports = active  # replaced as a whole
+        return active
+
+    def read_once(self):
+        """Executes queued commands, reads all active photodiodes and publishes a new sample."""
+        cycle_start = time.perf_counter()
+        if self._last_cycle is not None:
+            interval = cycle_start - self._last_cycle
+            self.cycle_interval = interval if self.cycle_interval is None else 0.8 * self.cycle_interval + 0.2 * interval
+        self._last_cycle = cycle_start
+        self._run_commands()
+
+        autodetect = self.autodetect  # same for all buses of the cycle
+        readings = ReadingSnapshot(self.size)  # filled by all buses, every port has its own row
+        results = self._on_buses(lambda ports: self._read_bus(ports, autodetect, readings))
+
+        # timing is recorded here, not in the bus workers; detection of all buses takes as long as the slowest one
+        if autodetect:
+            self.active_ports = sorted(port for (active, _, _) in results for port in active)
+            self.timing.record('detection', max((detection for (_, detection, _) in results), default=0.))
+
+        for (_, _, durations) in results:
+            for duration in durations:
+                self.timing.record('conversion', duration)
+
+        if self.cycle_interval is None:  # first cycle at this rate, estimated from its duration
+            self.cycle_interval = max(1 / self.rate, time.perf_counter() - cycle_start)
+
+        self.seq += 1
+        self.latest = Sample(self.seq, self.active_ports, readings, self.commands, self.rates())
+        self.buffer.publish(readings)
+        self.timing.record('acquisition', time.perf_counter() - cycle_start)
+        return self.latest
+
+    def _on_buses(self, function):
+        """Calls function with the port indexes of every bus, in the worker of the bus. Returns a list of results."""
+        if not self._workers:
+            return [function(ports) for ports in self.buses.values()]
+        futures = [self._workers[bus].submit(function, ports) for (bus, ports) in self.buses.items()]
+        return [future.result() for future in futures]
+
+    def error_counts(self):
+        """Returns error counts of all ports (see portGuard.PortGuard) and the number of quarantined ports."""
+        counts = dict.fromkeys(PortGuard.counter_names, 0)
+        for guard in self.guards.values():
+            for (name, count) in guard.counts.items():
+                counts[name] += count
+        counts['quarantined'] = sum(guard.quarantined_until is not None for guard in self.guards.values())
+        return counts
+
+    def _guarded(self, port, operation, failed=None):
+        """Calls operation(deadline) of a port through its PortGuard. Returns its result, failed if the port failed or is quarantined."""
+        guard = self.guards[port]
+        if guard.is_quarantined():
+            return failed
+        try:
+            return guard.call(operation, self.diodes[port].reopen)
+        except Exception as e:
+            print(f'Port {port + 1} failed {guard.retries + 1} times, it is left out for {guard.cooldown} s:', e)
+            return failed
+
+    def _check_bus(self, ports):
+        """Returns ports of a bus with a photodiode. A port that fails or is quarantined keeps its last state."""
+        return [port for port in ports if self._guarded(port, self.diodes[port].is_active, failed=self.diodes[port].active)]
+
+    def _read_bus(self, ports, autodetect, readings):
+        """Checks and reads the ports of one bus into readings. Returns active ports, detection duration and read durations."""
+        start = time.perf_counter()
+        if autodetect:
+            active = self._check_bus(ports)
+        else:
+            active = [port for port in self.active_ports if port in ports]
+        detection = time.perf_counter() - start
+
+        durations = []
+        for port in active:
+            diode = self.diodes[port]
+            start = time.perf_counter()
+            if self._guarded(port, diode.read_data_adc, failed=False) is False:
+                readings.mark_error(port, time.monotonic())
+                continue
+            durations.append(time.perf_counter() - start)
+            readings.store(port, diode, time.monotonic())
+
+        return (active, detection, durations)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='acquisition', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=2.):
+        """Stops the acquisition thread after its current cycle."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for worker in self._workers.values():
+            worker.shutdown(wait=False)
+
+    def _run_commands(self):
+        while True:
+            try:
+                (function, args) = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                function(*args)
+            except Exception as e:
+                print('An error occurred while executing a command:', e)
+            self.commands += 1
+
+    def _run(self):
+        next_log = time.monotonic()
+        self.schedule.set_rate(self.rate)
+
+        while not self._stop.is_set():
+            sample = self.read_once()
+
+            # a sample is logged when the logging period has passed, missed periods are skipped
+            # half a cycle of tolerance keeps every sample when both rates are equal and read times vary
+            tolerance = 0.5 / self.rate
+            if self.on_sample is not None and sample.time >= next_log - tolerance:
+                next_log = max(next_log + 1 / self.log_rate, sample.time - tolerance)
+                start = time.perf_counter()
+                try:
+                    self.on_sample(sample)
+                except Exception as e:
+                    print('An error occurred while logging a sample:', e)
+                self.timing.record('logging', time.perf_counter() - start)
+
+            self._stop.wait(self.schedule.next_delay())
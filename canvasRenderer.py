@@ -0,0 +1,158 @@
+import tkinter as tk
+from theme import *
+from portPanel import slot_area
+
+
+class CanvasText:
+    """Text item on the screen canvas.
+
+    Has the configure() method of a Tk label, so ViewModel updates it like a widget. Items with a command act as buttons,
+    hit-testing is done by CanvasScreen.
+
+    Constructor takes: canvas, font, text color, command (optional).
+    """
+
+    def __init__(self, canvas, font, fill, command=None, text=''):
+        self.canvas = canvas
+        self.item = canvas.create_text(0, 0, text=text, font=font, fill=fill, anchor='center')
+        self.command = command
+        self.area = (0, 0, 0, 0)  # (x0, y0, x1, y1) that reacts to a tap
+
+    def configure(self, **fields):
+        self.canvas.itemconfigure(self.item, **fields)
+
+    def move(self, x, y, width, height):
+        """Moves the text to its center (x, y). Tap area is width x height around it."""
+        self.canvas.coords(self.item, x, y)
+        self.area = (x - width / 2, y - height / 2, x + width / 2, y + height / 2)
+
+    def contains(self, x, y):
+        return self.area[0] <= x < self.area[2] and self.area[1] <= y < self.area[3]
+
+    def delete(self):
+        self.canvas.delete(self.item)
+
+
+class CanvasScreen:
+    """Measurement screen drawn on a single Canvas.
+
+    Replaces the frames, labels and buttons of port panels with items on one canvas (one X window). Text items are created once
+    and only their text is changed, taps are dispatched to panel items by hit-testing on the canvas.
+
+    Constructor takes: app (powermeter_app).
+
+    Example: app.canvas_screen = CanvasScreen(app)
+             panel = CanvasPanel(app, 0)
+    """
+
+    top = 0.1  # canvas is placed under the menu
+
+    def __init__(self, app):
+        self.app = app
+        self.panels = {}  # port index -> CanvasPanel
+
+        self.canvas = tk.Canvas(app,
+                                bg=space_blue,
+                                highlightthickness=0,
+                                borderwidth=0)
+        self.canvas.place(relx=0, rely=CanvasScreen.top, relwidth=1, relheight=1 - CanvasScreen.top)
+        self.canvas.bind('<Button-1>', self.tap)
+        self.canvas.bind('<Configure>', lambda event: self.layout())
+
+    def size(self):
+        return (self.canvas.winfo_width(), self.canvas.winfo_height())
+
+    def layout(self):
+        for panel in self.panels.values():
+            panel.layout()
+
+    def tap(self, event):
+        """Calls the command of the tapped item."""
+        for panel in self.panels.values():
+            for item in panel.widgets():
+                if item.command is not None and item.contains(event.x, event.y):
+                    item.command()
+                    return
+
+
+class CanvasPanel:
+    """Panel of one diode port drawn on the screen canvas.
+
+    Has the same interface as portPanel.PortPanel (fields, place(), widgets() and destroy()), app uses it instead of PortPanel
+    when renderer in display section of config file is 'canvas'.
+
+    Constructor takes: app (powermeter_app with canvas_screen), port index.
+
+    Example: panel = CanvasPanel(app, 2)
+             panel.place(1, 3)
+    """
+
+    def __init__(self, app, port):
+        self.app = app
+        self.port = port
+        self.slot = 0
+        self.count = 1
+        self.columns = 4
+        self.screen = app.canvas_screen
+        canvas = self.screen.canvas
+
+        self.background = canvas.create_rectangle(0, 0, 0, 0, fill=light_gray, width=0)
+        self.output_background = canvas.create_rectangle(0, 0, 0, 0, fill=white_ish, width=0)
+
+        self.title_label = CanvasText(canvas, titles, space_blue, text=f'P{port + 1}: ')
+        self.output_label = CanvasText(canvas, outputfont, red, command=lambda: app.show_trend(self.port), text='0.0')
+        self.amp_label = CanvasText(canvas, ampfont, orange)
+        self.offset_button = CanvasText(canvas, outputminifont, teal, command=lambda: app.set_offset(self.slot))
+        self.factor_button = CanvasText(canvas, outputminifont, teal, command=lambda: app.multiply_value_page(self.slot))
+        self.wavelength_button = CanvasText(canvas, outputminifont, teal, command=lambda: app.set_wavelength(self.slot))
+        self.amp_button = CanvasText(canvas, outputminifont, teal, command=lambda: app.set_range_to(self.slot))
+        self.amp_num = CanvasText(canvas, ampfont, space_blue)
+
+        self.screen.panels[port] = self
+
+    def place(self, slot, count, columns=4):
+        """Places the panel to given slot of count equal slots on the screen, at most columns in a row (see portPanel.slot_area)."""
+        self.slot = slot
+        self.count = count
+        self.columns = columns
+        self.layout()
+
+    def layout(self):
+        """Moves items of the panel to the current canvas size, same positions as PortPanel."""
+        (width, height) = self.screen.size()
+        canvas = self.screen.canvas
+
+        (relx, rely, relwidth, relheight) = slot_area(self.slot, self.count, self.columns)
+        frame_width = relwidth * width
+        x0 = relx * width
+        # slots are relative to the window, canvas starts at CanvasScreen.top of window height
+        y0 = (rely - CanvasScreen.top) / (1 - CanvasScreen.top) * height
+        panel_height = relheight / (1 - CanvasScreen.top) * height
+        x = x0 + frame_width / 2
+
+        canvas.coords(self.background, x0, y0, x0 + frame_width, y0 + panel_height)
+        canvas.coords(self.output_background, x0 + 0.03*frame_width, y0 + 0.2*panel_height,
+                      x0 + 0.97*frame_width, y0 + 0.36*panel_height)
+
+        row = 0.09 * panel_height
+        self.title_label.move(x, y0 + self.app.labely, frame_width, row)
+        self.output_label.move(x, y0 + 0.28*panel_height, frame_width, 0.16*panel_height)
+        self.amp_label.move(x, y0 + 0.42*panel_height, frame_width, row)
+        self.offset_button.move(x, y0 + 0.51*panel_height, frame_width, row)
+        self.factor_button.move(x, y0 + 0.6*panel_height, frame_width, row)
+        self.wavelength_button.move(x, y0 + 0.7*panel_height, frame_width, row)
+        self.amp_button.move(x, y0 + 0.8*panel_height, frame_width, row)
+        self.amp_num.move(x, y0 + 0.9*panel_height, frame_width, row)
+
+    def widgets(self):
+        return [self.title_label, self.output_label, self.offset_button, self.wavelength_button,
+                self.amp_num, self.amp_label, self.amp_button, self.factor_button]
+
+    def destroy(self):
+        """Deletes items of the panel and forgets their rendered state."""
+        for item in self.widgets():
+            self.app.view.forget(item)
+            item.delete()
+        self.screen.canvas.delete(self.background)
+        self.screen.canvas.delete(self.output_background)
+        self.screen.panels.pop(self.port, None)
@@ -0,0 +1,94 @@
+#!/usr/local/lib/  python3
+"""Headless powermeter.
+
+Runs acquisition and logging from the same configuration as the GUI (config.yaml, last_settings.yaml), without a display.
+Does not import tkinter, so it starts without X and can run as a systemd service. Stops on SIGTERM or Ctrl+C.
+
+Usage: python3 headless.py [--no-log] [--duration SECONDS] [--print] [--timing PATH]
+SIGUSR1 writes the timing report (see instrumentation.Instrumentation) to PATH (default timing.txt).
+"""
+
+import argparse
+import os
+import signal
+import threading
+from os.path import dirname, abspath
+
+import settings
+from acquisition import Acquisition
+from instrumentation import StartupTimer
+from measurementLog import MeasurementLog, format_power
+
+
+def print_sample(sample):
+    errors = sample.readings.errors()
+    cells = []
+    for port in sorted(sample.ports):
+        reading = sample.readings.get(port)
+        if reading is not None:
+            cells.append(f'P{port + 1}: {format_power(reading)} {reading["unit"]}')
+        elif port in errors:
+            cells.append(f'P{port + 1}: PORT ERROR')
+    print(f'{sample.wall_time:.2f}', *cells, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Powermeter without GUI: reads photodiodes and logs measured values.')
+    parser.add_argument('--no-log', action='store_true', help='do not log measured values')
+    parser.add_argument('--duration', type=float, default=None, help='[s] stop after this time, runs until stopped by default')
+    parser.add_argument('--print', action='store_true', help='print logged samples to standard output')
+    parser.add_argument('--timing', default=None, help='write timing report to this file on exit and on SIGUSR1')
+    args = parser.parse_args()
+
+    startup = StartupTimer()
+    os.chdir(dirname(abspath(__file__)))
+    settings.preload('calibration.yaml')
+
+    data = settings.load_config()
+    rates = settings.saved_rates(data, settings.load_last_settings())
+    startup.mark('settings')
+
+    data = settings.discover_ports(data)
+    diodes = settings.create_diodes(data)
+    startup.mark('hardware')
+    ports = settings.port_count(data)
+    (logger, usb_sync) = settings.create_logger(data['logging'], ports)
+    measurement_log = MeasurementLog(logger, diodes, ports)
+    startup.mark('logger')
+
+    acquisition = Acquisition(diodes, rates['acquisition rate'], rates['logging rate'], port_errors=data.get('port errors'))
+    acquisition.timing.startup = startup
+
+    def on_sample(sample):
+        measurement_log.log_sample(sample)
+        if args.print:
+            print_sample(sample)
+
+    acquisition.on_sample = on_sample
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGUSR1, lambda signum, frame: acquisition.timing.dump(args.timing or 'timing.txt'))
+
+    if not args.no_log:
+        measurement_log.start()
+    acquisition.start()
+    startup.mark('acquisition')
+    print(f'Powermeter running headless, {len(diodes)} port(s).', startup.report(), sep='\n', end='', flush=True)
+
+    stop.wait(args.duration)
+
+    acquisition.stop()
+    if args.timing is not None:
+        acquisition.timing.dump(args.timing)
+    measurement_log.stop()
+    logger.close()
+    usb_sync.stop()
+    settings.close_diodes(diodes)
+
+    return
+
+
+if __name__ == '__main__':
+    main()
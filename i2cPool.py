@@ -0,0 +1,98 @@
+import threading
+
+
+class I2cPool:
+    """Pool of pigpio I2C handles.
+
+    pigpio daemon has a small table of I2C handles, a handle that is not closed stays taken until the daemon restarts. Handles are
+    kept by (bus, address): every device is opened once and shared by all its users (e.g. a new Diode of the same port), it is
+    closed when its last user releases it or by close_all() on shutdown.
+
+    Use the module instance pool.
+
+    Constructor takes: nothing.
+
+    Example: handle = pool.acquire(rpi, 1, 0x48)
+             rpi.i2c_read_device(handle, 2)
+             pool.release(1, 0x48)
+    """
+
+    def __init__(self):
+        self.entries = {}  # (bus, address) -> [pigpio connection, handle, users]
+        self.lock = threading.Lock()
+        self.opened = 0
+        self.closed = 0
+        self.reused = 0
+        self.failed = 0
+
+    def acquire(self, rpi, bus, address):
+        """Returns the handle of a device, opens it with pigpio connection rpi if it is not open. Raises OSError if it can not be opened."""
+        key = (bus, address)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry[2] += 1
+                self.reused += 1
+                return entry[1]
+
+            handle = self._open(rpi, bus, address)
+            self.entries[key] = [rpi, handle, 1]
+            return handle
+
+    def release(self, bus, address):
+        """Ends one use of a device, closes its handle after the last one."""
+        with self.lock:
+            entry = self.entries.get((bus, address))
+            if entry is None:
+                return
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self.entries[(bus, address)]
+                self._close(entry[0], entry[1])
+
+    def reopen(self, bus, address):
+        """Closes and opens a device again (e.g. after bus errors), users keep their count. Returns the new handle."""
+        with self.lock:
+            entry = self.entries[(bus, address)]
+            self._close(entry[0], entry[1])
+            entry[1] = self._open(entry[0], bus, address)
+            return entry[1]
+
+    def close_all(self):
+        """Closes all handles, e.g. on shutdown."""
+        with self.lock:
+            for (rpi, handle, users) in self.entries.values():
+                self._close(rpi, handle)
+            self.entries.clear()
+
+    def metrics(self):
+        """Returns numbers of open handles and their users, and counts of opened, closed, reused and failed handles."""
+        with self.lock:
+            return {'open': len(self.entries),
+                    'users': sum(entry[2] for entry in self.entries.values()),
+                    'opened': self.opened,
+                    'closed': self.closed,
+                    'reused': self.reused,
+                    'failed': self.failed}
+
+    def _open(self, rpi, bus, address):
+        try:
+            handle = rpi.i2c_open(bus, address)
+        except Exception as e:  # pigpio.error, e.g. no free handle
+            self.failed += 1
+            raise OSError(f'I2C device {hex(address)} on bus {bus} could not be opened: {e}')
+        if handle < 0:
+            self.failed += 1
+            raise OSError(f'I2C device {hex(address)} on bus {bus} could not be opened: error {handle}')
+        self.opened += 1
+        return handle
+
+    def _close(self, rpi, handle):
+        try:
+            rpi.i2c_close(handle)
+        except Exception as e:
+            print('An error occurred while closing I2C handle:', e)
+        self.closed += 1
+
+
+pool = I2cPool()
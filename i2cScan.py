@@ -0,0 +1,171 @@
+"""Discovery of powermeter ports on the I2C buses.
+
+A port is an ADC (ADS1115, addresses 0x48-0x4b) with its I/O Expander (TCA9534A, 0x38-0x3b, same offset as the ADC). Every
+address of these ranges is probed with a register read, buses are scanned in parallel with their own pigpio connection.
+
+The ports found are kept in a cache file with a fingerprint of the hardware (board serial number, I2C buses of the system and the
+scanned buses). Later starts use the cache without scanning until the fingerprint changes or the cache is removed.
+Found ports are added after the diode ports of config (see merge_ports), listed ports are never renumbered.
+
+Usage: python3 i2cScan.py [--bus 1 --bus 3]   (scans again and prints the ports found)
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import hashlib
+import os
+
+import yaml
+
+ADC_ADDRESSES = range(0x48, 0x4c)
+TCA_OFFSET = 0x38 - 0x48  # I/O Expander address of a port = ADC address + offset
+
+ADC_CONF_REG = 0x01
+TCA_CONF_REG = 0x03
+
+
+def responds(rpi, bus, address, register, word=False):
+    """Returns True if a device answers a read of register on bus at address."""
+    try:
+        handle = rpi.i2c_open(bus, address)
+    except Exception:
+        return False
+    if handle < 0:
+        return False
+
+    try:
+        value = rpi.i2c_read_word_data(handle, register) if word else rpi.i2c_read_byte_data(handle, register)
+        return value >= 0
+    except Exception:  # pigpio.error, device did not acknowledge
+        return False
+    finally:
+        rpi.i2c_close(handle)
+
+
+def scan_bus(rpi, bus):
+    """Returns ports found on a bus, list of (ADC address, I/O Expander address)."""
+    ports = []
+    for adc_add in ADC_ADDRESSES:
+        tca_add = adc_add + TCA_OFFSET
+        if responds(rpi, bus, adc_add, ADC_CONF_REG, word=True) and responds(rpi, bus, tca_add, TCA_CONF_REG):
+            ports.append((adc_add, tca_add))
+    return ports
+
+
+def scan(buses, connect):
+    """Scans buses in parallel, connect(bus) returns the pigpio connection of a bus. Returns dict bus -> ports (see scan_bus)."""
+    buses = list(buses)
+    with concurrent.futures.ThreadPoolExecutor(max(len(buses), 1)) as executor:
+        futures = {bus: executor.submit(lambda bus: scan_bus(connect(bus), bus), bus) for bus in buses}
+
+    found = {}
+    for (bus, future) in futures.items():
+        try:
+            found[bus] = future.result()
+        except Exception as e:
+            print(f'An error occurred while scanning I2C bus {bus}:', e)
+            found[bus] = []
+    return found
+
+
+def port_table(found, select_pins=None):
+    """Returns diode ports in the format of config (see diode ports in config.yaml), ordered by bus and ADC address."""
+    select_pins = select_pins or {}
+    ports = {}
+    for bus in sorted(found):
+        for (adc_add, tca_add) in sorted(found[bus]):
+            port = {'bus': bus, 'i2c address': {'adc': adc_add, 'tca': tca_add}}
+            if bus in select_pins:
+                port['select pin'] = select_pins[bus]
+            ports[f'diodeport {len(ports) + 1}'] = port
+    return ports
+
+
+def merge_ports(configured, found, select_pins=None):
+    """Returns diode ports of config (see diode ports in config.yaml) with ports found on the buses added after them.
+
+    Configured ports keep their order, bus, select pin and numbers, also when they are missing, so log columns do not move.
+    Found ports that are not in config are numbered after the configured ones, with the select pin of select_pins or of
+    a configured port on the same bus."""
+    select_pins = dict(select_pins or {})
+    known = set()
+    for port in configured.values():
+        bus = port.get('bus', 1)
+        known.add((bus, port['i2c address']['adc']))
+        if 'select pin' in port:
+            select_pins.setdefault(bus, port['select pin'])
+
+    ports = dict(configured)
+    added = {bus: [(adc_add, tca_add) for (adc_add, tca_add) in found[bus] if (bus, adc_add) not in known] for bus in found}
+    for port in port_table(added, select_pins).values():
+        number = len(ports) + 1
+        while f'diodeport {number}' in ports:  # names of config may skip numbers
+            number += 1
+        ports[f'diodeport {number}'] = port
+    return ports
+
+
+def fingerprint(buses):
+    """Returns a fingerprint of the hardware: board serial number, I2C buses of the system and buses to scan."""
+    serial = ''
+    for path in ('/sys/firmware/devicetree/base/serial-number', '/proc/device-tree/serial-number'):
+        try:
+            with open(path, 'rb') as file:
+                serial = file.read().strip(b'\0\n').decode('ascii', 'replace')
+            break
+        except OSError:
+            continue
+
+    text = repr((serial, sorted(glob.glob('/dev/i2c-*')), sorted(buses), list(ADC_ADDRESSES), TCA_OFFSET))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def load_cache(path, key):
+    """Returns ports of the cache file if it was written for the hardware with fingerprint key, None otherwise."""
+    try:
+        with open(path, 'r') as file:
+            cache = yaml.safe_load(file)
+    except (OSError, yaml.YAMLError):
+        return None
+    if not isinstance(cache, dict) or not cache.get('fingerprint') == key:
+        return None
+    return {int(bus): [tuple(port) for port in ports] for (bus, ports) in cache['ports'].items()}
+
+
+def save_cache(path, key, found):
+    try:
+        with open(path + '.tmp', 'w') as file:
+            yaml.safe_dump({'fingerprint': key, 'ports': {bus: [list(port) for port in ports] for (bus, ports) in found.items()}},
+                           file, default_flow_style=False)
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print('An error occurred while writing I2C scan cache:', e)
+
+
+def discover(buses, connect, cache_path, rescan=False):
+    """Returns ports on buses (see scan), from the cache if the hardware did not change. Result of a scan is cached if it found ports."""
+    key = fingerprint(buses)
+    found = None if rescan else load_cache(cache_path, key)
+    if found is None:
+        found = scan(buses, connect)
+        if any(found.values()):
+            save_cache(cache_path, key, found)
+    return found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scan I2C buses for powermeter ports.')
+    parser.add_argument('--bus', type=int, action='append', help='I2C bus to scan, may be repeated (buses of diode ports and port discovery in config by default)')
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    import settings
+    from Diode import Diode
+
+    data = settings.load_config()
+    discovery = data['port discovery']
+    buses = args.bus or sorted({port.get('bus', Diode.BUS) for port in data['diode ports'].values()} | set(discovery['buses'] or []))
+    found = discover(buses, Diode.connect, settings.data_path(discovery['cache']), rescan=True)
+    for (name, port) in port_table(found).items():
+        print(f'{name}: bus {port["bus"]}, adc {hex(port["i2c address"]["adc"])}, tca {hex(port["i2c address"]["tca"])}')
@@ -0,0 +1,183 @@
+import math
+import time
+
+
+class Histogram:
+    """Fixed-size histogram of durations.
+
+    Buckets are logarithmic, buckets_per_decade from 1 us up to 10 s, plus one for longer durations. Recording is a few arithmetic
+    operations and never allocates, so it can stay on all the time.
+
+    Example: histogram = Histogram()
+             histogram.record(0.012)
+             histogram.percentile(99)  # [s]
+    """
+
+    lowest = 1e-6  # [s]
+    decades = 7
+    buckets_per_decade = 4
+
+    def __init__(self):
+        self.counts = [0] * (Histogram.decades * Histogram.buckets_per_decade + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def record(self, duration):
+        """Records a duration [s]."""
+        if duration > Histogram.lowest:
+            index = min(int(math.log10(duration / Histogram.lowest) * Histogram.buckets_per_decade), len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+
+    def upper_bound(self, index):
+        """Returns the longest duration [s] of a bucket."""
+        if index == len(self.counts) - 1:
+            return math.inf
+        return Histogram.lowest * 10 ** ((index + 1) / Histogram.buckets_per_decade)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def percentile(self, p):
+        """Returns upper bound [s] of the bucket with the p-th percentile, limited by the longest recorded duration."""
+        if self.count == 0:
+            return 0.
+        target = self.count * p / 100
+        seen = 0
+        for (index, count) in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def reset(self):
+        self.__init__()
+
+
+class StartupTimer:
+    """Durations of startup phases.
+
+    Each mark() ends a phase that started at the previous mark (or at construction).
+
+    Constructor takes: clock (optional, returns seconds).
+
+    Example: startup = StartupTimer()
+             load_settings()
+             startup.mark('settings')
+             print(startup.report())
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.last = self.started
+        self.phases = []  # (name, duration [s])
+
+    def mark(self, phase):
+        now = self.clock()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def total(self):
+        return self.last - self.started
+
+    def report(self):
+        """Returns a text report of phase durations [ms]."""
+        lines = [f'Startup in {self.total() * 1000:.0f} ms']
+        for (phase, duration) in self.phases:
+            lines.append(f'  {phase:<16}{duration * 1000:>8.1f}')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """Timing of the measurement loop.
+
+    Keeps a Histogram of durations for each phase: acquisition (one cycle of all ports), detection (checking connected diodes),
+    conversion (reading and converting one port), logging and rendering (one display tick). Schedules whose overruns are reported
+    are added with watch(), other counters (e.g. open I2C handles) with add_counters().
+
+    Constructor takes: nothing.
+
+    Example: timing = Instrumentation()
+             start = time.perf_counter()
+             read()
+             timing.record('conversion', time.perf_counter() - start)
+             timing.dump('timing.txt')
+    """
+
+    phases = ('acquisition', 'detection', 'conversion', 'logging', 'rendering')
+    short_names = {'acquisition': 'acq', 'detection': 'det', 'conversion': 'conv', 'logging': 'log', 'rendering': 'draw'}
+
+    def __init__(self):
+        self.histograms = {phase: Histogram() for phase in Instrumentation.phases}
+        self.schedules = {}  # name -> scheduler.PeriodicSchedule
+        self.counters = {}  # name -> function returning dict of counts
+        self.startup = None  # StartupTimer, included in the report
+        self.started = time.time()
+
+    def record(self, phase, duration):
+        self.histograms[phase].record(duration)
+
+    def watch(self, name, schedule):
+        """Adds a schedule whose overruns and skipped ticks are reported."""
+        self.schedules[name] = schedule
+
+    def add_counters(self, name, counters):
+        """Adds a function returning a dict of counts, reported with their current values."""
+        self.counters[name] = counters
+
+    def overlay_text(self):
+        """Returns a one line summary: p99 duration of each phase [ms] and overruns of each schedule."""
+        cells = []
+        for (phase, histogram) in self.histograms.items():
+            if histogram.count:
+                cells.append(f'{Instrumentation.short_names[phase]} {histogram.percentile(99) * 1000:.1f}')
+        for (name, schedule) in self.schedules.items():
+            cells.append(f'{name} over {schedule.overruns}')
+        return '  '.join(cells)
+
+    def summary(self):
+        """Returns a text report of all phases and schedules."""
+        lines = [f'Timing since {time.ctime(self.started)}, durations in ms',
+                 f'{"phase":<12}{"count":>10}{"mean":>10}{"p50":>10}{"p99":>10}{"max":>10}']
+        for (phase, histogram) in self.histograms.items():
+            lines.append(f'{phase:<12}{histogram.count:>10}{histogram.mean() * 1000:>10.2f}{histogram.percentile(50) * 1000:>10.2f}'
+                         f'{histogram.percentile(99) * 1000:>10.2f}{histogram.max * 1000:>10.2f}')
+
+        for (name, schedule) in self.schedules.items():
+            lines.append(f'{name}: {schedule.rate} Hz, {schedule.overruns} overruns, {schedule.skipped} skipped ticks')
+
+        for (name, counters) in self.counters.items():
+            lines.append(f'{name}: ' + ', '.join(f'{key} {value}' for (key, value) in counters().items()))
+
+        lines.append('')
+        lines.append('Buckets (upper bound [ms]: count)')
+        for (phase, histogram) in self.histograms.items():
+            buckets = [f'{histogram.upper_bound(i) * 1000:.3g}: {count}' for (i, count) in enumerate(histogram.counts) if count]
+            lines.append(f'{phase}: ' + ', '.join(buckets))
+
+        if self.startup is not None:
+            lines.append('')
+            lines.append(self.startup.report().rstrip('\n'))
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Writes the report to a file. Returns the path."""
+        try:
+            with open(path, 'w') as file:
+                file.write(self.summary())
+        except OSError as e:
+            print('An error occurred while writing timing report:', e)
+        return path
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.started = time.time()
@@ -0,0 +1,102 @@
+import os
+import struct
+import zlib
+
+
+# START
+# record definitions
+# record: length of payload (uint32), CRC32 of payload (uint32), payload
+# payload: record type (1 byte), data
+
+record_header = struct.Struct('<II')
+
+HEADER = b'H'  # segment header text
+ROWS = b'R'  # logged rows text
+CHECKPOINT = b'C'  # durable checkpoint, everything before it is on the disk
+# END
+
+
+class Journal:
+    """Append-only write-ahead journal of a log segment.
+
+    Every write of the session logger is appended to the journal as a record with its own checksum before it is written to the segment.
+    checkpoint() makes all appended records durable (fsync). If the power is lost, records after the last checkpoint may be lost or torn,
+    recover() drops them and the segment is rebuilt from the journal.
+
+    Constructor takes: path of the journal file.
+
+    Example: journal = Journal('spool/session/session_0001.csv.journal')
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'ab')
+        self.records = 0
+
+    def append(self, record_type, data):
+        """Appends a record. Takes record type (HEADER, ROWS) and data (bytes)."""
+        payload = record_type + data
+        self.file.write(record_header.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.records += 1
+
+    def checkpoint(self):
+        """Writes a checkpoint record and makes the journal durable."""
+        self.append(CHECKPOINT, b'')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self, remove=True):
+        """Closes the journal. Removes it, if its segment is completed."""
+        self.file.close()
+        if remove:
+            os.remove(self.path)
+
+
+def read_records(path):
+    """Reads valid records of a journal file.
+
+    Returns: (records, valid_length) -> records is a list of (record type, data), valid_length is the number of bytes up to the first torn or corrupted record."""
+    records = []
+    valid_length = 0
+
+    with open(path, 'rb') as file:
+        data = file.read()
+
+    while valid_length + record_header.size <= len(data):
+        (length, crc) = record_header.unpack_from(data, valid_length)
+        start = valid_length + record_header.size
+        payload = data[start:start + length]
+
+        if length == 0 or len(payload) < length or not zlib.crc32(payload) == crc:
+            break
+
+        records.append((payload[:1], payload[1:]))
+        valid_length = start + length
+
+    return (records, valid_length)
+
+
+def recover(path):
+    """Truncates torn records at the end of a journal file. Returns valid records."""
+    (records, valid_length) = read_records(path)
+
+    if valid_length < os.path.getsize(path):
+        print(f'Journal {path}: dropped {os.path.getsize(path) - valid_length} bytes of torn records.')
+        with open(path, 'r+b') as file:
+            file.truncate(valid_length)
+            file.flush()
+            os.fsync(file.fileno())
+
+    return records
+
+
+def sync_directory(path):
+    """Makes renames and new files in a directory durable."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
@@ -1,8 +1,9 @@
 #!/bin/sh
 # launcher.sh
 # execute powermeter python script
+# runs the current release under the update supervisor, see updateService.py
 
 cd /
 cd /home/pi/Work/RPI_Powermeter/
-python3 main.py
+python3 updateService.py supervise
 cd /
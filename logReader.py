@@ -0,0 +1,313 @@
+import bisect
+import hashlib
+import os
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+gzip_magic = b'\x1f\x8b'
+zstd_magic = b'\x28\xb5\x2f\xfd'
+chunk_size = 2**16
+
+# START
+# binary log format (.pmlog)
+# header: magic (6 bytes), version (uint8), number of ports (uint8), reserved (8 bytes)
+# records: fixed size, see record_dtype(), sorted by time
+
+binary_magic = b'PMLOG\x00'
+binary_version = 1
+binary_header = struct.Struct('<6sBB8x')
+
+# unit codes, 0 -> port inactive
+units = ['', 'W', 'mW', 'uW', 'nW', 'pW', 'V']
+unit_scale = np.array([np.nan, 1, 1e-3, 1e-6, 1e-9, 1e-12, 1], dtype='<f8')  # unit code -> factor to W (or V)
+
+# converted logs are kept here, not next to their source (spool sessions are copied to USB and pruned)
+cache_directory = os.path.join(os.environ.get('POWERMETER_DATA', ''), 'pmlog_cache')
+# END
+
+
+def detect_compression(path):
+    """Returns compression of a log file ('none', 'gzip' or 'zstd') based on its first bytes."""
+    with open(path, 'rb') as file:
+        magic = file.read(4)
+
+    if magic[:2] == gzip_magic:
+        return 'gzip'
+    if magic == zstd_magic:
+        return 'zstd'
+    return 'none'
+
+
+def iter_chunks(path):
+    """Yields decompressed chunks of a log file.
+
+    Truncated compressed files (power cut while writing) are read up to the last complete block."""
+    compression = detect_compression(path)
+
+    with open(path, 'rb') as file:
+        if compression == 'gzip':
+            decompressor = zlib.decompressobj(31)
+            while True:
+                data = file.read(chunk_size)
+                if not data:
+                    return
+                while data:
+                    try:
+                        yield decompressor.decompress(data)
+                    except zlib.error:
+                        return  # torn block at the end of file
+                    data = decompressor.unused_data
+                    if decompressor.eof:
+                        decompressor = zlib.decompressobj(31)  # next gzip member
+                    else:
+                        data = b''
+
+        elif compression == 'zstd':
+            if zstandard is None:
+                raise ImportError('zstandard is needed to read ' + path)
+            reader = zstandard.ZstdDecompressor().stream_reader(file, read_across_frames=True)
+            while True:
+                try:
+                    data = reader.read(chunk_size)
+                except zstandard.ZstdError:
+                    return  # torn block at the end of file
+                if not data:
+                    return
+                yield data
+
+        else:
+            while True:
+                data = file.read(chunk_size)
+                if not data:
+                    return
+                yield data
+
+
+def iter_lines(path):
+    """Yields text lines of a log file, compressed or not. Incomplete last line is skipped."""
+    rest = b''
+    for chunk in iter_chunks(path):
+        lines = (rest + chunk).split(b'\n')
+        rest = lines.pop()
+        for line in lines:
+            yield line.decode('utf-8', errors='replace') + '\n'
+
+
+def read_rows(path):
+    """Yields measured rows of a log file as (time, entries), entries are (value, unit) per port or None for inactive port.
+
+    Legacy logs (single file per session, written before segments) left one empty cell for an inactive port instead of two."""
+    legacy = False
+
+    for line in iter_lines(path):
+        cells = line.rstrip('\n').split(',')
+        try:
+            measurement_time = float(cells[0])
+        except ValueError:
+            if line.startswith('PowerMeter'):
+                legacy = 'segment' not in line
+            continue  # header lines
+
+        entries = []
+        i = 1
+        while i < len(cells):
+            if cells[i].strip() == '':
+                entries.append(None)
+                i += 1 if legacy else 2
+            else:
+                entries.append((cells[i], cells[i + 1] if i + 1 < len(cells) else ''))
+                i += 2
+        yield (measurement_time, entries)
+
+
+def count_ports(path, default=4):
+    """Returns number of ports in the column header of a log file. Logs without one (legacy) have default ports."""
+    for line in iter_lines(path):
+        if line.startswith('Time'):
+            return line.count('Port ')
+        if not line.startswith('PowerMeter'):
+            break
+    return default
+
+
+def session_segments(session_dir):
+    """Returns a sorted list of completed segment files of a session directory."""
+    segments = []
+    for name in sorted(os.listdir(session_dir)):
+        if name.endswith(('.csv', '.csv.gz', '.csv.zst')):
+            segments.append(os.path.join(session_dir, name))
+    return segments
+
+
+def export_session(session_dir, target):
+    """Exports all segments of a session (compressed or not) into one uncompressed CSV file with a single header."""
+    header_written = False
+    with open(target, 'w') as out:
+        for segment in session_segments(session_dir):
+            for line in iter_lines(segment):
+                is_header = line.startswith('PowerMeter') or line.startswith('Time')
+                if is_header and header_written:
+                    continue
+                out.write(line)
+            header_written = True
+    return
+
+
+def record_dtype(ports):
+    """Returns NumPy structured dtype of one binary log record for given number of ports."""
+    return np.dtype([('time', '<f8'),
+                     ('power', '<f8', (ports,)),
+                     ('unit', 'u1', (ports,))])
+
+
+class BinaryLog:
+    """Memory-mapped binary session log.
+
+    Records are mapped into a NumPy structured array without copying or parsing, loading takes the same time for any size of log.
+    Time-range slicing uses binary search over the sorted time column, port views are strided views into the mapped records.
+
+    Constructor takes: path of a .pmlog file.
+
+    Example: log = BinaryLog('session.pmlog')
+             power = log.port(0, 3600, 7200)['power']
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            (magic, version, ports) = binary_header.unpack(file.read(binary_header.size))
+
+        if not magic == binary_magic or not version == binary_version:
+            raise ValueError(f'{path} is not a powermeter binary log.')
+
+        self.path = path
+        self.ports = ports
+        self.dtype = record_dtype(ports)
+
+        count = (os.path.getsize(path) - binary_header.size) // self.dtype.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=binary_header.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def time(self):
+        return self.records['time']
+
+    def index(self, start=None, stop=None):
+        """Returns a slice of records with start <= time < stop. Takes times in [s]."""
+        # bisect reads only log2(n) time values from the strided mapped column, np.searchsorted would copy the column first
+        first = 0 if start is None else bisect.bisect_left(self.time, start)
+        last = len(self.records) if stop is None else bisect.bisect_left(self.time, stop)
+        return slice(first, last)
+
+    def time_range(self, start=None, stop=None):
+        """Returns records (view) with start <= time < stop."""
+        return self.records[self.index(start, stop)]
+
+    def port(self, port, start=None, stop=None):
+        """Returns views of one port between start and stop: dict with 'time', 'power' and 'unit' arrays."""
+        records = self.time_range(start, stop)
+        return {'time': records['time'],
+                'power': records['power'][:, port],
+                'unit': records['unit'][:, port]}
+
+    def power_in_watts(self, port, start=None, stop=None):
+        """Returns power of one port in W (or V in service mode). Inactive samples are NaN. Makes a copy."""
+        view = self.port(port, start, stop)
+        return view['power'] * unit_scale[view['unit']]
+
+
+def parse_entries(rows, ports):
+    """Converts parsed rows into a structured array of records."""
+    records = np.zeros(len(rows), dtype=record_dtype(ports))
+    empty = [float('nan')] * ports
+    times = []
+    powers = []
+    unit_codes = []
+
+    for (measurement_time, entries) in rows:
+        power = list(empty)
+        unit = [0] * ports
+        for (port, entry) in enumerate(entries[:ports]):
+            if entry is None:
+                continue
+            try:
+                power[port] = float(entry[0])
+                unit[port] = units.index(entry[1].strip())
+            except ValueError:
+                power[port] = float('nan')
+        times.append(measurement_time)
+        powers.append(power)
+        unit_codes.append(unit)
+
+    if rows:
+        records['time'] = times
+        records['power'] = powers
+        records['unit'] = unit_codes
+
+    return records
+
+
+def convert_csv(sources, target, ports=None, rows_per_block=65536):
+    """Converts CSV logs (compressed or not) into one binary log file with a streaming parser.
+
+    Takes: sources (path of a CSV file, session directory or list of paths), target path of .pmlog file,
+    number of ports (read from the header of the first log by default).
+    Only a block of rows is held in memory at a time."""
+    if isinstance(sources, str):
+        sources = session_segments(sources) if os.path.isdir(sources) else [sources]
+    if ports is None:
+        ports = count_ports(sources[0]) if sources else 4
+
+    temp = target + '.tmp'
+    with open(temp, 'wb') as out:
+        out.write(binary_header.pack(binary_magic, binary_version, ports))
+
+        block = []
+        for source in sources:
+            for row in read_rows(source):
+                block.append(row)
+                if len(block) == rows_per_block:
+                    parse_entries(block, ports).tofile(out)
+                    block = []
+        parse_entries(block, ports).tofile(out)
+
+    os.replace(temp, target)
+    return target
+
+
+def cache_path(path, directory=None):
+    """Returns path of the converted .pmlog file of a CSV log or session directory in the cache directory."""
+    name = os.path.basename(path.rstrip('/'))
+    for extension in ('.csv', '.csv.gz', '.csv.zst'):
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    # logs with the same name in different directories (e.g. spool and USB drive) get different files
+    digest = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:10]
+    return os.path.join(directory or cache_directory, f'{name}-{digest}.pmlog')
+
+
+def load(path, ports=None, directory=None):
+    """Returns BinaryLog of a log. CSV logs and session directories are converted once into the cache directory
+    (cache_directory by default, outside the spool) and mapped afterwards."""
+    if path.endswith('.pmlog'):
+        return BinaryLog(path)
+
+    target = cache_path(path, directory)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    if not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path):
+        convert_csv(path, target, ports)
+
+    return BinaryLog(target)
@@ -0,0 +1,132 @@
+import datetime
+import threading
+
+
+def get_time():
+    """Returns current time as string. Format: YYYY-MM-DD_HH-MM-SS."""
+    ct = datetime.datetime.now()
+    time_string = f'{ct}'[0:10] + '_' + f'{ct}'[11:13] + \
+        '-' + f'{ct}'[14:16] + '-' + f'{ct}'[17:19]
+    return time_string
+
+
+def format_power(reading, service_mode=False):
+    """Returns measured power of a reading (see acquisition.Sample) as a string, rounded for display and log."""
+    if service_mode:
+        return f'{(round(reading["power"], 7))}'[:7]
+
+    value = f'{(round(reading["power"], 5))}'[:5]
+
+    if (reading['amplification'] == 7) and reading['under 10']:
+        value = f'{(round(reading["power"], 2))}'[:4]
+        if value[-1] == '.':
+            value = value[0:-1]
+
+    return value
+
+
+def port_settings(diode):
+    """Returns settings of a diode that are stored with logged values."""
+    return {'diode': diode.get_name(),
+            'wavelength': diode.get_wavelength(),
+            'filter': diode.get_multiply_factor_string(),
+            'filter factor': diode.get_multiply_factor(),
+            'offset': diode.offset,
+            'gain': 'auto' if diode.get_auto_range() else diode.get_amplification()}
+
+
+class MeasurementLog:
+    """Measurement log.
+
+    Turns acquisition samples into rows of the session logger. A session is started with the first sample after start(),
+    port settings are logged whenever they change. Used by the GUI and the headless app alike.
+
+    log_sample() is called from the acquisition thread, start() and stop() from any thread.
+
+    Constructor takes: SessionLogger, diodes (dict port index -> Diode), number of ports (columns of the log).
+
+    Example: log = MeasurementLog(logger, diodes, 4)
+             acquisition.on_sample = log.log_sample
+             log.start()
+    """
+
+    def __init__(self, logger, diodes, ports=4):
+        self.logger = logger
+        self.diodes = diodes
+        self.ports = ports
+        self.service_mode = False
+        self.logging = False
+        self.session_not_set = True
+        self.time_origin = 0.
+        self.logged_settings = {}
+        self.lock = threading.Lock()  # guards logging state shared with the acquisition thread
+
+    def is_logging(self):
+        return self.logging
+
+    def start(self):
+        """Starts logging. New session begins with the next sample."""
+        with self.lock:
+            self.logging = True
+
+    def stop(self):
+        """Stops logging and ends the current session."""
+        with self.lock:
+            self.logging = False
+            self.session_not_set = True
+            self.logger.stop_session()
+
+    def suspend(self):
+        """Stops logging before a restart of the app. Returns state of the session, resume() continues it.
+
+        Number of the last segment is added by the caller once the logger is closed (see SessionLogger.last_segment)."""
+        with self.lock:
+            state = {'logging': self.logging,
+                     'session time': None if self.session_not_set else self.logger.session_time,
+                     'time origin': self.time_origin}
+            self.logging = False
+            self.session_not_set = True
+            self.logger.stop_session()
+        return state
+
+    def resume(self, state):
+        """Continues logging with the state returned by suspend(). Time column goes on from the time origin of the session."""
+        with self.lock:
+            self.logging = state['logging']
+            if self.logging and state['session time'] is not None:
+                self.session_not_set = False
+                self.time_origin = state['time origin']
+                self.logged_settings = {}
+                self.logger.resume_session(state['session time'], state.get('segment', 0))
+
+    def log_sample(self, sample):
+        """Logs a sample (see acquisition.Sample)."""
+
+        with self.lock:
+            if not self.logging:
+                return
+
+            if self.session_not_set:  # starts a new logging session
+                self.session_not_set = False
+                self.logger.start_session(get_time())
+                self.time_origin = sample.wall_time
+                self.logged_settings = {}
+
+            measurement_time = sample.wall_time - self.time_origin
+            if sample.rates is not None:
+                self.logger.rates = sample.rates  # written to the header of the next segment
+
+            # keeps the right port order of values, inactive ports are left empty
+            entries = [None] * self.ports
+            for (port, reading) in sample.readings.items():
+                entries[port] = (format_power(reading, self.service_mode), reading['unit'])
+
+                # port settings are logged when they change
+                settings = port_settings(self.diodes[port])
+                if not self.logged_settings.get(port) == settings:
+                    self.logged_settings[port] = settings
+                    self.logger.log_settings(measurement_time, port, settings)
+
+            self.logger.log(measurement_time, entries)
+
+        return
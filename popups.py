@@ -0,0 +1,616 @@
+import os
+import time
+import tkinter as tk
+import tkinter.messagebox as messagebox
+from theme import *
+import settings
+from settings import rate_limits
+
+
+def keypad_button(parent, text, command, font=settingsfont, width=2, height=2, bg=space_blue, fg=white_ish):
+    """Returns a keypad button with pop-up colors."""
+    return tk.Button(parent,
+                     bg=bg,
+                     fg=fg,
+                     font=font,
+                     justify='center',
+                     text=text,
+                     width=width,
+                     height=height,
+                     command=command)
+
+
+class Popup:
+    """Reusable pop-up window.
+
+    The window and its widgets are built once, on first use (or earlier with create()). Afterwards opening the pop-up only resets
+    entered values, binds it to a port and shows the window; closing it hides the window. Subclasses implement build() and reset().
+
+    A pop-up is bound to a port, not to a slot on the screen, so it keeps changing the right diode when other diodes are plugged in.
+
+    Constructor takes: app (powermeter_app).
+
+    Example: popup = WavelengthPopup(app)
+             popup.show(1)  # for the diode in the second slot
+    """
+
+    title = '.'
+    geometry = '200x200+300+150'
+    background = white_ish
+    name = None
+
+    def __init__(self, app):
+        self.app = app
+        self.window = None
+        self.port = None
+
+    def build(self):
+        """Creates widgets of the window. Called once."""
+        pass
+
+    def reset(self):
+        """Clears entered values. Called every time the window is shown."""
+        pass
+
+    def create(self):
+        """Builds the window, hidden, if it is not built yet."""
+        if self.window is None or not self.window.winfo_exists():
+            self.window = tk.Toplevel(self.app, bg=self.background, relief='flat', name=self.name)
+            self.window.withdraw()
+            self.window.title(self.title)
+            self.window.geometry(self.geometry)
+            self.window.protocol('WM_DELETE_WINDOW', self.hide)
+            self.build()
+
+    def show(self, num=None):
+        """Shows the window. Takes slot of the diode (position in app.list_of_act_diodes) the pop-up is for."""
+        self.create()
+        if num is not None:
+            self.port = self.app.active_diodes[num]
+        self.reset()
+        self.window.deiconify()
+        self.window.lift()
+
+    def hide(self):
+        if self.window is not None:
+            self.window.withdraw()
+
+    def diode(self):
+        """Returns the diode of the bound port."""
+        return self.app.diodes[self.port]
+
+    def render(self):
+        """Renders settings of the bound port, if it is still displayed."""
+        if self.port in self.app.active_diodes:
+            self.app.render_port_settings(self.app.active_diodes.index(self.port))
+
+
+######
+######
+######
+# MULTIPLY VALUE PAGES
+
+
+class MultiplyPopup(Popup):
+    """Filter selection of a port: ND filters, custom factor or custom ND filter code."""
+
+    title = '.'
+    geometry = '240x275+285+85'
+
+    def build(self):
+        # pages of filter types, built on first use and bound to the same port
+        self.filter_pages = {'ND1': NdFilterPopup(self, 'ND1', 10, 'NE510B-B', 'ne510b-b'),
+                             'ND2': NdFilterPopup(self, 'ND2', 100, 'NE520B-B', 'ne520b-b'),
+                             'ND3': NdFilterPopup(self, 'ND3', 1000, 'NE530B-B', 'ne530b-b'),
+                             'ND5': NdFilterPopup(self, 'ND5', 100000, 'NE550B-B', 'ne550b-b')}
+        self.custom_value_page = CustomValuePopup(self)
+        self.custom_nd_page = CustomNdPopup(self)
+
+        buttons = [('ND0,3', lambda: self.set_value(2, 'ND0,3'), 0.25, 0.1),
+                   ('ND0,6', lambda: self.set_value(4, 'ND0,6'), 0.25, 0.3),
+                   ('ND1', lambda: self.open(self.filter_pages['ND1']), 0.25, 0.5),
+                   ('ND2', lambda: self.open(self.filter_pages['ND2']), 0.75, 0.1),
+                   ('ND3', lambda: self.open(self.filter_pages['ND3']), 0.75, 0.3),
+                   ('ND5', lambda: self.open(self.filter_pages['ND5']), 0.75, 0.5)]
+
+        for (text, command, relx, rely) in buttons:
+            keypad_button(self.window, text, command, font=ampfont, width=10).place(relx=relx, rely=rely, anchor='center')
+
+        keypad_button(self.window, 'custom value', lambda: self.open(self.custom_value_page),
+                      font=ampfont, width=10, bg=dark_blue).place(relx=0.25, rely=0.7, anchor='center')
+        keypad_button(self.window, 'custom nd', lambda: self.open(self.custom_nd_page),
+                      font=ampfont, width=10, bg=orange).place(relx=0.75, rely=0.7, anchor='center')
+        keypad_button(self.window, 'reset', lambda: self.set_value(1, 'apply filter'),
+                      font=ampfont, width=23, bg=teal).place(relx=0.5, rely=0.9, anchor='center')
+
+    def open(self, page):
+        """Opens a sub-page for the same port."""
+        page.port = self.port
+        page.show()
+
+    def set_value(self, value, text):
+        self.diode().set_multiply_factor(value)
+        self.diode().set_multiply_factor_string(text)
+        self.render()
+        self.hide()
+
+    def confirm_ndvalue(self, filter_name):
+        """Reads ND filter designation and gets its multiplication factor from calibration file."""
+        calibration = settings.load_cached('calibration.yaml')
+        wavelength = self.diode().get_wavelength()
+
+        if filter_name not in calibration['filters']:
+            messagebox.showwarning(
+                title='Not calibrated', message='This ND filter is not yet calibrated.')
+            self.set_value(1, 'apply filter')
+        elif not (wavelength > 550 and wavelength < 1150):
+            messagebox.showwarning(
+                title='Not calibrated', message='This ND filter is not calibrated at chosen wavelength.')
+            self.set_value(1, 'apply filter')
+        else:
+            self.set_value(calibration['filters'][filter_name][wavelength - 550], f'{filter_name}')
+
+
+class NdFilterPopup(Popup):
+    """Choice between a nominal ND filter value and a calibrated filter of the same type."""
+
+    geometry = '120x120+350+112'
+
+    def __init__(self, multiply_page, nominal, value, filter_text, filter_name):
+        Popup.__init__(self, multiply_page.app)
+        self.multiply_page = multiply_page
+        self.title = f'{nominal} filters'
+        self.nominal = nominal
+        self.value = value
+        self.filter_text = filter_text
+        self.filter_name = filter_name
+
+    def build(self):
+        keypad_button(self.window, self.nominal, self.set_nominal,
+                      font=ampfont, width=10).place(relx=0.5, rely=0.3, anchor='center')
+        keypad_button(self.window, self.filter_text, self.set_filter,
+                      font=ampfont, width=10).place(relx=0.5, rely=0.75, anchor='center')
+
+    def set_nominal(self):
+        self.hide()
+        self.multiply_page.set_value(self.value, self.nominal)
+
+    def set_filter(self):
+        self.hide()
+        self.multiply_page.confirm_ndvalue(self.filter_name)
+
+
+class CustomNdPopup(Popup):
+    """Keypad for an ND filter code, e.g. NE510B-B."""
+
+    title = 'ND code'
+    geometry = '250x350+290+30'
+
+    def __init__(self, multiply_page):
+        Popup.__init__(self, multiply_page.app)
+        self.multiply_page = multiply_page
+        self.code = ''
+
+    def build(self):
+        self.ndfilter = tk.Label(self.window,
+                                 font=outputminifont,
+                                 fg=space_blue,
+                                 bg=light_gray,
+                                 justify='center',
+                                 height=2,
+                                 width=20,
+                                 text='')
+        self.ndfilter.place(relx=0.5, rely=0.09, anchor='center')
+
+        keys = [('0', '0'), ('1', '1'), ('2', '2'), ('3', '3'), ('4', '4'),
+                ('5', '5'), ('6', '6'), ('7', '7'), ('8', '8'), ('9', '9'),
+                ('A', 'a'), ('B', 'b'), ('C', 'c'), ('R', 'r'), ('-', '-'),
+                ('ND', 'nd'), ('NE', 'ne'), ('UV', 'uv'), ('NIR', 'nir'), ('IR', 'ir')]
+
+        for (i, (text, code)) in enumerate(keys):
+            keypad_button(self.window, text, lambda code=code: self.add_to_value(code)).place(relx=(i % 5) * 0.2, rely=0.18 + (i // 5) * 0.15)
+
+        keypad_button(self.window, 'ok', self.confirm_value, width=20).place(relx=0.5, rely=0.89, anchor='center')
+
+    def reset(self):
+        self.code = ''
+        self.ndfilter['text'] = ''
+
+    def add_to_value(self, code):
+        """Concats a string designation of ND filter."""
+        self.code = self.code + code
+        self.ndfilter['text'] = self.code
+
+    def confirm_value(self):
+        """Gets multiplication factor of the entered ND filter from calibration file."""
+        calibration = settings.load_cached('calibration.yaml')
+        wavelength = self.diode().get_wavelength()
+        self.hide()
+
+        if self.code not in calibration['filters']:
+            messagebox.showwarning(
+                title='Not calibrated', message='This ND filter is not yet calibrated.')
+            self.multiply_page.set_value(1, 'apply filter')
+        elif wavelength not in calibration['calibrated wavelengths']:
+            messagebox.showwarning(
+                title='Not calibrated', message='This ND filter is not calibrated at chosen wavelength.')
+            self.multiply_page.set_value(1, 'apply filter')
+        else:
+            value = calibration['filters'][self.code][f'{wavelength}']
+            self.multiply_page.set_value(value, f'{value}')
+
+
+class CustomValuePopup(Popup):
+    """Keypad for a custom multiplication factor."""
+
+    title = 'Multiply'
+    geometry = '225x210+290+140'
+
+    def __init__(self, multiply_page):
+        Popup.__init__(self, multiply_page.app)
+        self.multiply_page = multiply_page
+        self.value = 0
+        self.decimal_count = 0
+
+    def build(self):
+        self.multiplication = tk.Label(self.window,
+                                       font=normalminifont,
+                                       fg=space_blue,
+                                       bg=light_gray,
+                                       justify='center',
+                                       height=2,
+                                       width=20,
+                                       text='multiply value by')
+        self.multiplication.place(relx=0.5, rely=0.1, anchor='center')
+
+        for digit in range(10):
+            keypad_button(self.window, f'{digit}', lambda digit=digit: self.add_to_value(digit),
+                          font=ampfont).place(relx=(digit % 5) * 0.2, rely=0.22 + (digit // 5) * 0.26)
+
+        keypad_button(self.window, '.', self.dec_count, font=ampfont).place(relx=0, rely=0.74)
+        keypad_button(self.window, 'ok', self.confirm_value, font=ampfont, width=18).place(relx=0.2, rely=0.74)
+
+    def reset(self):
+        self.value = 0
+        self.decimal_count = 0
+        self.multiplication['text'] = 'multiply value by'
+
+    def dec_count(self):
+        self.decimal_count += 1
+
+    def add_to_value(self, digit):
+        if self.decimal_count == 0:
+            self.value = (10 * self.value) + digit
+        else:
+            self.value = self.value + (digit / 10**self.decimal_count)
+            self.decimal_count += 1
+        self.multiplication['text'] = self.value
+
+    def confirm_value(self):
+        self.hide()
+        self.multiply_page.set_value(self.value, f'{self.value}')
+
+
+######
+######
+######
+# OFFSET, WAVELENGTH AND RANGE PAGES
+
+
+class OffsetPopup(Popup):
+    """Keypad for the value to offset the output by."""
+
+    title = 'Set offset'
+    geometry = '305x235+250+125'
+
+    def build(self):
+        self.offset = tk.Label(self.window,
+                               font=outputminifont,
+                               fg=space_blue,
+                               bg=light_gray,
+                               justify='center',
+                               height=2,
+                               text='')
+        self.offset.place(relx=0, rely=0., relwidth=1, relheight=0.25)
+
+        for digit in range(10):
+            keypad_button(self.window, f'{digit}', lambda digit=digit: self.add_to_value(digit),
+                          font=ampfont).place(relx=(digit % 5) / 6, rely=0.25 + (digit // 5) * 0.25, relwidth=(1/6), relheight=0.25)
+
+        keypad_button(self.window, '+', lambda: self.set_sign(True), font=ampfont, width=4).place(
+            relx=(5/6), rely=0.25, relwidth=(1/6), relheight=0.25)
+        keypad_button(self.window, '-', lambda: self.set_sign(False), font=ampfont, width=4).place(
+            relx=(5/6), rely=0.5, relwidth=(1/6), relheight=0.25)
+        keypad_button(self.window, '.', self.dec_count, font=ampfont).place(
+            relx=0, rely=0.75, relwidth=(1/6), relheight=0.25)
+        keypad_button(self.window, 'ok', self.confirm_value, font=ampfont, width=20).place(
+            relx=(1/6), rely=0.75, relwidth=(5/6), relheight=0.25)
+
+    def reset(self):
+        self.value = 0
+        self.sign = True
+        self.decimal_count = 0
+        self.offset['text'] = ''
+
+    def set_sign(self, sign):
+        self.sign = sign
+
+    def dec_count(self):
+        self.decimal_count += 1
+
+    def add_to_value(self, digit):
+        if self.decimal_count == 0:
+            self.value = (10 * abs(self.value)) + digit
+        else:
+            self.value = abs(self.value) + (digit / 10**self.decimal_count)
+            self.dec_count()
+
+        if self.sign == False:
+            self.value = 0 - self.value
+        self.offset['text'] = self.value
+
+    def confirm_value(self):
+        self.diode().set_offset(self.value)
+        self.render()
+        self.hide()
+
+
+class WavelengthPopup(Popup):
+    """Keypad for the wavelength of measured light, with shortcuts for common wavelengths."""
+
+    title = 'Set wavelength'
+    geometry = '305x235+250+125'
+
+    def build(self):
+        self.wavelength = tk.Label(self.window,
+                                   font=outputminifont,
+                                   fg=space_blue,
+                                   bg=light_gray,
+                                   justify='center',
+                                   height=2,
+                                   width=21,
+                                   text='')
+        self.wavelength.place(relx=0.379, rely=0.13, anchor='center')
+
+        for digit in range(10):
+            keypad_button(self.window, f'{digit}', lambda digit=digit: self.add_to_value(digit)).place(
+                relx=(digit % 5) * 0.152, rely=0.25 + (digit // 5) * 0.25)
+
+        keypad_button(self.window, 'ok', self.confirm_value, width=20).place(relx=0, rely=0.75)
+
+        for (i, wavelength) in enumerate((635, 940, 976, 1030)):
+            keypad_button(self.window, f'{wavelength}', lambda wavelength=wavelength: self.set_value(wavelength),
+                          width=4).place(relx=0.76, rely=i * 0.25)
+
+    def reset(self):
+        self.value = 0
+        self.wavelength['text'] = ''
+
+    def add_to_value(self, digit):
+        self.value = (10 * self.value) + digit
+        self.wavelength['text'] = self.value
+
+    def set_value(self, value):
+        self.value = value
+        self.wavelength['text'] = self.value
+        self.confirm_value()
+
+    def confirm_value(self):
+        if self.value > 350 and self.value <= 1100:
+            self.diode().set_wavelength(self.value)
+            self.render()
+        else:
+            messagebox.showwarning(title='Unsupported wavelength',
+                                   message='Inserted wavelength is outside of measurable interval.')
+        self.hide()
+
+
+class RangePopup(Popup):
+    """Manual amplification range (0 - 7) or auto range."""
+
+    title = '.'
+    geometry = '190x172+305+155'
+
+    def build(self):
+        for amp in range(8):
+            keypad_button(self.window, f'{amp}', lambda amp=amp: self.set_range(amp)).place(
+                relx=(amp % 4) * 0.25, rely=(amp // 4) * 0.35)
+
+        keypad_button(self.window, 'auto', self.set_auto, width=15).place(relx=0, rely=0.68)
+
+    def set_range(self, amp):
+        # gain is written to the hardware by the acquisition thread, settings are rendered once it is set
+        self.app.acquisition.submit(self.diode().set_amplification, amp)
+        self.hide()
+
+    def set_auto(self):
+        self.diode().toggle_true_auto_range()
+        self.render()
+        self.hide()
+
+
+######
+######
+######
+# SETTINGS PAGE
+
+
+class SettingsPopup(Popup):
+    """Settings of the powermeter: auto detection, logging, rates, service mode, USB eject and reset."""
+
+    title = 'Settings'
+    geometry = '500x420+150+10'
+    background = light_gray
+    name = 'settings'
+
+    def message(self, text, rely):
+        tk.Message(self.window,
+                   text=text,
+                   width=120,
+                   bg=light_gray,
+                   fg=black,
+                   justify='center').place(relx=0.2, rely=rely, anchor='center')
+
+    def build(self):
+        """AUTO DETECTION"""
+
+        self.message('Auto-detection: ', 0.08)
+        self.enable_btn = keypad_button(self.window, 'enable', lambda: self.set_autodetect(True), width=8, height=1)
+        self.enable_btn.place(relx=0.5, rely=0.08, anchor='center')
+        self.disable_btn = keypad_button(self.window, 'disable', lambda: self.set_autodetect(False), width=8, height=1)
+        self.disable_btn.place(relx=0.75, rely=0.08, anchor='center')
+
+        """LOGGING VALUES SETTINGS"""
+
+        self.message('Logging values:', 0.2)
+        self.log_diode_btn = keypad_button(self.window, 'start log', self.start_log, width=8, height=1)
+        self.log_diode_btn.place(relx=0.5, rely=0.2, anchor='center')
+        self.stoplog_diode_btn = keypad_button(self.window, 'stop log', self.stop_log, width=8, height=1)
+        self.stoplog_diode_btn.place(relx=0.75, rely=0.2, anchor='center')
+
+        """RATE SETTINGS"""
+        # display, acquisition and logging rates are set independently
+
+        self.rate_labels = {}
+        rate_rows = (('refresh rate', 'Display rate:', 0.32),
+                     ('acquisition rate', 'Acquisition rate:', 0.44),
+                     ('logging rate', 'Logging rate:', 0.56))
+
+        for (name, text, rely) in rate_rows:
+            self.message(text, rely)
+
+            self.rate_labels[name] = tk.Label(self.window,  # label with current rate
+                                              font=settingsfont,
+                                              justify='center',
+                                              width=8,
+                                              height=1)
+            self.rate_labels[name].place(relx=0.42, rely=rely, anchor='center')
+
+            keypad_button(self.window, '+', lambda name=name: self.change_rate(name, 1),
+                          height=1, bg=light_gray, fg=black).place(relx=0.563, rely=rely, anchor='center')
+            keypad_button(self.window, '-', lambda name=name: self.change_rate(name, -1),
+                          height=1, bg=light_gray, fg=black).place(relx=0.685, rely=rely, anchor='center')
+            keypad_button(self.window, 'ok', self.confirm_rates,
+                          height=1, bg=teal).place(relx=0.815, rely=rely, anchor='center')
+
+        """ SERVICE MODE ENABLE """
+
+        self.message('Service mode: ', 0.74)
+        self.enable_SM_btn = keypad_button(self.window, 'enable', lambda: self.toggle_servicemode(True), width=8, height=1)
+        self.enable_SM_btn.place(relx=0.5, rely=0.74, anchor='center')
+        self.disable_SM_btn = keypad_button(self.window, 'disable', lambda: self.toggle_servicemode(False), width=8, height=1)
+        self.disable_SM_btn.place(relx=0.75, rely=0.74, anchor='center')
+
+        """MISCELLANEOUS BUTTONS"""
+
+        keypad_button(self.window, 'eject usb', self.eject_usb, width=6, height=1, bg=teal).place(relx=0.5, rely=0.9, anchor='center')
+        keypad_button(self.window, 'back', self.hide, width=3, height=1, bg=red).place(relx=0.9, rely=0.9, anchor='center')
+        keypad_button(self.window, 'reset', self.reset_settings, width=3, height=1, bg=teal).place(relx=0.1, rely=0.9, anchor='center')
+
+    def toggle_colors(self, enable_btn, disable_btn, enabled):
+        """Colors a pair of enable/disable buttons according to the current state."""
+        if enabled:
+            enable_btn.configure(bg=teal, fg=white_ish)
+            disable_btn.configure(bg=light_gray, fg=black)
+        else:
+            enable_btn.configure(bg=light_gray, fg=black)
+            disable_btn.configure(bg=red, fg=white_ish)
+
+    def reset(self):
+        app = self.app
+        logging = app.measurement_log.is_logging()
+
+        self.toggle_colors(self.enable_btn, self.disable_btn, app.autodetect)
+        self.toggle_colors(self.log_diode_btn, self.stoplog_diode_btn, logging)
+        self.toggle_colors(self.enable_SM_btn, self.disable_SM_btn, app.service_mode)
+
+        for (name, label) in self.rate_labels.items():
+            label.configure(text=self.rate_text(name),
+                            bg=teal if logging else light_gray,
+                            fg=white_ish if logging else black)
+
+    """BUTTONS RELATED FUNCTIONS"""
+
+    def eject_usb(self):
+        """Stops logging, copies the spool to USB in the sync worker and unmounts the drive when it is done (at most 10 s)."""
+        self.stop_log()
+        request = self.app.usb_sync.request_sync()
+        self.app.after(200, self.poll_eject, request, time.monotonic() + 10.)
+
+    def poll_eject(self, request, deadline):
+        """Waits for the sync requested by eject_usb() without blocking the GUI, then unmounts the drive."""
+        usb_sync = self.app.usb_sync
+        if not usb_sync.is_synced(request) and time.monotonic() < deadline:
+            self.app.after(200, self.poll_eject, request, deadline)
+            return
+
+        if not usb_sync.pending() == 0:
+            messagebox.showwarning(
+                title='USB not synced', message=f'{usb_sync.pending()} log segment(s) are not copied yet. They will be copied once a USB drive is connected.')
+        cmd = "sudo umount /dev/sda1"
+        os.system(cmd)
+
+    def start_log(self):
+        if not self.app.measurement_log.is_logging():
+            self.app.usb_path = self.app.get_usb_path()
+            self.app.measurement_log.start()
+        self.hide()
+
+    def stop_log(self):
+        self.app.measurement_log.stop()
+        self.app.usb_path = ''
+        self.hide()
+
+    def set_autodetect(self, enabled):
+        self.app.autodetect = enabled
+        self.app.acquisition.autodetect = enabled
+        self.hide()
+
+    def toggle_servicemode(self, mode):
+        self.app.service_mode = mode
+        self.app.measurement_log.service_mode = mode
+
+        for diode in self.app.all_diodes:
+            diode.set_serviceMode(mode)
+
+        self.app.render_port_settings()
+        self.hide()
+
+    def rate_text(self, name):
+        """Returns set rate, followed by the achieved one if the acquisition can not keep up (e.g. '15>6 Hz')."""
+        rate = self.app.rates[name]
+        rates = self.app.acquisition.rates()
+        achieved = rates.get(f'achieved {name}')
+        if achieved is not None and rates[name] == rate and achieved < 0.9 * rate:  # only once the rate is applied
+            return f'{rate}>{achieved:.0f} Hz'
+        return f'{rate} Hz'
+
+    def change_rate(self, name, step):
+        (lowest, highest) = rate_limits[name]
+        self.app.rates[name] = min(max(self.app.rates[name] + step, lowest), highest)
+        self.app.save_last_settings()
+        self.rate_labels[name].configure(text=self.rate_text(name))
+
+    def confirm_rates(self):
+        self.app.apply_rates()
+        self.hide()
+
+    def reset_settings(self):  # resets all settings to their default values
+        app = self.app
+        app.source = False
+        app.reading_pow = True
+        app.autodetect = True
+        for diode in app.list_of_act_diodes:
+            diode.set_wavelength(1030)
+            diode.toggle_true_auto_range()
+            diode.set_multiply_factor(1)
+            diode.set_multiply_factor_string('apply filter')
+            diode.set_offset(0)
+
+        app.acquisition.autodetect = True
+        app.rates = dict(app.default_rates)
+        app.apply_rates()
+        app.save_last_settings()
+
+        app.render_port_settings()
+        self.hide()
@@ -0,0 +1,81 @@
+import time
+
+
+class PortGuard:
+    """Error handling of one port.
+
+    Every hardware operation of the port gets a deadline (checked by Diode between I2C transfers). A failed operation (I2C error,
+    deadline passed, values that do not settle) is retried with a backoff after the I2C handles are opened again. When all retries
+    fail, the port is quarantined: it is left out of acquisition for the cooldown and tried again afterwards. Other ports keep
+    their rate meanwhile, failures are counted instead. A failing port blocks its bus for at most timeout * (retries + 1) and the
+    backoff. Timeout must not be shorter than a normal read, Acquisition uses the longest read of the port (Diode.read_time).
+
+    Constructor takes: timeout of one operation [s], number of retries, backoff of the first retry [s] (doubled on every further
+    retry), quarantine cooldown [s], clock (optional, returns seconds).
+
+    Example: guard = PortGuard(Diode.read_time(), 1, 0.01, 10.)
+             if not guard.is_quarantined():
+                 active = guard.call(diode.is_active, diode.reopen)
+    """
+
+    counter_names = ('errors', 'timeouts', 'retries', 'reopens', 'quarantines')
+
+    def __init__(self, timeout=1., retries=1, backoff=0.01, cooldown=10., clock=time.monotonic):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.clock = clock
+        self.quarantined_until = None
+        self.last_error = None
+        self.counts = dict.fromkeys(PortGuard.counter_names, 0)
+
+    @staticmethod
+    def from_config(section, timeout=1.):
+        """Returns a PortGuard with settings of the port errors section of config, defaults if section is None.
+
+        timeout is used if the section sets none (null)."""
+        if section is None:
+            return PortGuard(timeout)
+        if section['timeout'] is not None:
+            timeout = section['timeout']
+        return PortGuard(timeout, section['retries'], section['backoff'], section['cooldown'])
+
+    def is_quarantined(self):
+        """Returns True while the port is left out. Quarantine ends after the cooldown, the next operation tries the port again."""
+        if self.quarantined_until is None:
+            return False
+        if self.clock() >= self.quarantined_until:
+            self.quarantined_until = None
+            return False
+        return True
+
+    def call(self, operation, reopen):
+        """Calls operation(deadline) with retries, reopen() is called before every retry. Returns its result.
+
+        Raises the last error if all attempts failed, the port is quarantined then."""
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+                self.counts['retries'] += 1
+                try:
+                    reopen()
+                    self.counts['reopens'] += 1
+                except Exception as e:
+                    self.count_error(e)
+                    continue
+
+            try:
+                return operation(self.clock() + self.timeout)
+            except Exception as e:  # I2C errors are pigpio.error or OSError, deadline and settling TimeoutError
+                self.count_error(e)
+
+        self.quarantined_until = self.clock() + self.cooldown
+        self.counts['quarantines'] += 1
+        raise self.last_error
+
+    def count_error(self, error):
+        self.last_error = error
+        self.counts['errors'] += 1
+        if isinstance(error, TimeoutError):
+            self.counts['timeouts'] += 1
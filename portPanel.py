@@ -0,0 +1,156 @@
+import math
+import tkinter as tk
+from theme import *
+
+
+def slot_area(slot, count, columns=4):
+    """Returns (relx, rely, relwidth, relheight) of a slot on the screen, relative to the app window.
+
+    Takes: slot, number of slots, most slots in one row. Slots fill rows from left to right."""
+    columns = min(count, columns)
+    rows = math.ceil(count / columns)
+
+    frame_width = 0.96 / columns
+    frame_dist = 0.04 / (columns + 1)
+    frame_height = (0.85 - (rows - 1) * 0.01) / rows
+    (row, column) = divmod(slot, columns)
+
+    return ((column + 1)*frame_dist + column*frame_width,
+            0.12 + row * (frame_height + 0.01),
+            frame_width,
+            frame_height)
+
+
+class PortPanel:
+    """Panel of one diode port on the measurement screen.
+
+    A panel is created when a diode is connected to its port and destroyed when the diode is disconnected.
+    Panels of other ports keep their widgets and are only placed again, so plugging a diode in does not rebuild the screen.
+
+    Panel buttons open pop-up windows for the panel's current slot (position in app.list_of_act_diodes).
+    Tapping the measured value opens the trend plot of the port.
+
+    Constructor takes: app (powermeter_app), port index.
+
+    Example: panel = PortPanel(app, 2)
+             panel.place(1, 3)
+    """
+
+    def __init__(self, app, port):
+        self.app = app
+        self.port = port
+        self.slot = 0
+
+        self.frame = tk.Frame(app,
+                              width=f'{app.wid_width}m',
+                              height=f'{app.frame_height}m',
+                              relief='flat',
+                              bg=light_gray)
+
+        self.title_label = tk.Label(self.frame,
+                                    text=f'P{port + 1}: ',
+                                    font=titles,
+                                    fg=space_blue,
+                                    bg=light_gray,
+                                    justify='center',
+                                    height=app.h_banner,
+                                    width=app.label_width)
+
+        self.output_label = tk.Label(self.frame,
+                                     width=app.text_width-2,
+                                     height=1,
+                                     bg=white_ish,
+                                     fg=red,
+                                     font=outputfont,
+                                     relief='flat',
+                                     justify='center',
+                                     text='0.0')
+
+        self.offset_button = tk.Button(self.frame,
+                                       width=app.label_width+6,
+                                       height=1,
+                                       fg=teal,
+                                       bg=light_gray,
+                                       font=outputminifont,
+                                       text='',
+                                       relief='flat',
+                                       command=lambda: app.set_offset(self.slot))
+
+        self.wavelength_button = tk.Button(self.frame,
+                                           width=app.label_width+6,
+                                           height=1,
+                                           fg=teal,
+                                           bg=light_gray,
+                                           font=outputminifont,
+                                           text='',
+                                           relief='flat',
+                                           command=lambda: app.set_wavelength(self.slot))
+
+        self.amp_num = tk.Label(self.frame,
+                                width=app.label_width,
+                                height=app.h_banner,
+                                fg=space_blue,
+                                bg=light_gray,
+                                font=ampfont,
+                                text='')
+
+        self.amp_label = tk.Label(self.frame,
+                                  width=app.label_width+10,
+                                  height=app.h_banner,
+                                  bg=light_gray,
+                                  font=ampfont,
+                                  fg=orange,
+                                  justify='center',
+                                  text='')
+
+        self.amp_button = tk.Button(self.frame,
+                                    width=app.text_width-2,
+                                    height=1,
+                                    bg=light_gray,
+                                    fg=teal,
+                                    font=outputminifont,
+                                    relief='flat',
+                                    border=0,
+                                    text='',
+                                    command=lambda: app.set_range_to(self.slot))
+
+        self.factor_button = tk.Button(self.frame,
+                                       width=app.label_width+6,
+                                       height=1,
+                                       fg=teal,
+                                       bg=light_gray,
+                                       font=outputminifont,
+                                       text='',
+                                       relief='flat',
+                                       command=lambda: app.multiply_value_page(self.slot))
+
+        self.output_label.bind('<Button-1>', lambda event: app.show_trend(self.port))  # tap on the value opens trend plot
+
+        self.title_label.place(relx=0.5, y=app.labely, anchor='center')
+        self.output_label.place(relx=0.5, rely=0.28, anchor='center')
+        self.offset_button.place(relx=0.5, rely=0.51, anchor='center')
+        self.amp_label.place(relx=0.5, rely=0.42, anchor='center')
+        self.factor_button.place(relx=0.5, rely=0.6, anchor='center')
+        self.wavelength_button.place(relx=0.5, rely=0.7, anchor='center')
+        self.amp_button.place(relx=0.5, rely=0.8, anchor='center')
+        self.amp_num.place(relx=0.5, rely=0.90, anchor='center')
+
+    def place(self, slot, count, columns=4):
+        """Places the panel to given slot of count equal slots on the screen, at most columns in a row (see slot_area)."""
+        self.slot = slot
+        (relx, rely, relwidth, relheight) = slot_area(slot, count, columns)
+
+        self.frame.place(relx=relx,
+                         rely=rely,
+                         relwidth=relwidth,
+                         relheight=relheight)  # relative positioning of frames to master window
+
+    def widgets(self):
+        return [self.title_label, self.output_label, self.offset_button, self.wavelength_button,
+                self.amp_num, self.amp_label, self.amp_button, self.factor_button]
+
+    def destroy(self):
+        """Destroys the panel and forgets its rendered state."""
+        for widget in self.widgets():
+            self.app.view.forget(widget)
+        self.frame.destroy()
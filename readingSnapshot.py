@@ -0,0 +1,119 @@
+import collections.abc
+import time
+
+import numpy as np
+
+
+units = ('W', 'mW', 'uW', 'nW', 'pW', 'V')  # unit field is an index into units, V in service mode
+
+# flags field of a port
+READ = 0x01  # port was read in the cycle
+OVEREXPOSED = 0x02
+UNDEREXPOSED = 0x04
+UNDER_10 = 0x08  # signal below 5 % of the upper threshold, see Diode.is_under_10
+PORT_ERROR = 0x10  # port failed or is quarantined (see portGuard.PortGuard), it was not read
+
+reading_dtype = np.dtype([('power', 'f8'), ('unit', 'u1'), ('gain', 'u1'), ('flags', 'u1'), ('time', 'f8')])
+
+
+class ReadingSnapshot(collections.abc.Mapping):
+    """Readings of all ports of one acquisition cycle.
+
+    One NumPy structured array with a row per port: power, unit, gain (amplification), flags and time of the read (monotonic [s]).
+    The acquisition stores every port read once per cycle, consumers read whole columns (e.g. snapshot.array['power']) or a port
+    as a mapping port index -> reading dict with 'power', 'unit', 'amplification', 'exposure' and 'under 10' (ports read only).
+    Ports that failed in the cycle are marked with PORT_ERROR instead, see errors().
+
+    Constructor takes: number of ports, array (optional, rows of reading_dtype used instead of a new one).
+
+    Example: snapshot = ReadingSnapshot(4)
+             snapshot.store(0, diode, time.monotonic())
+             snapshot[0]['power']
+    """
+
+    def __init__(self, ports, array=None):
+        self.array = np.zeros(ports, dtype=reading_dtype) if array is None else array
+
+    def store(self, port, diode, read_time):
+        """Stores the last reading of a Diode for a port."""
+        flags = READ
+        if diode.overexposed:
+            flags |= OVEREXPOSED
+        elif diode.underexposed:
+            flags |= UNDEREXPOSED
+        if diode.is_under_10():
+            flags |= UNDER_10
+        self.array[port] = (diode.power_read, units.index(diode.power_unit), diode.amp_bit_dg408, flags, read_time)
+
+    def mark_error(self, port, read_time):
+        """Marks a port that failed or is quarantined, it has no reading in the cycle."""
+        self.array[port] = (0., 0, 0, PORT_ERROR, read_time)
+
+    def errors(self):
+        """Returns indexes of the ports marked with PORT_ERROR in the cycle."""
+        return np.flatnonzero(self.array['flags'] & PORT_ERROR).tolist()
+
+    def ports(self):
+        """Returns indexes of the ports read in the cycle."""
+        return np.flatnonzero(self.array['flags'] & READ).tolist()
+
+    def __getitem__(self, port):
+        if not 0 <= port < len(self.array) or not self.array['flags'][port] & READ:
+            raise KeyError(port)
+        (power, unit, gain, flags, _) = self.array[port].tolist()
+        if flags & OVEREXPOSED:
+            exposure = 'OVEREXPOSED'
+        elif flags & UNDEREXPOSED:
+            exposure = 'UNDEREXPOSED'
+        else:
+            exposure = False
+        return {'power': power, 'unit': units[unit], 'amplification': gain, 'exposure': exposure, 'under 10': bool(flags & UNDER_10)}
+
+    def __iter__(self):
+        return iter(self.ports())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.array['flags'] & READ))
+
+
+class SnapshotBuffer:
+    """Newest readings of all ports, written by one thread and read by any number of others without locks.
+
+    Works as a seqlock: version is odd while publish() copies a snapshot into the buffer and is increased to the next even number
+    when it is done. A reader copies the buffer and keeps the copy only if version was even and did not change meanwhile,
+    otherwise it copies again. The writer never waits for readers; readers poll cheaply with read_if_changed(), which only
+    compares versions while nothing new was published.
+
+    Constructor takes: number of ports.
+
+    Example: buffer = SnapshotBuffer(4)
+             buffer.publish(snapshot)  # acquisition thread
+             (version, readings) = buffer.read_if_changed(version)  # any thread, readings is None if nothing changed
+    """
+
+    def __init__(self, ports):
+        self.array = np.zeros(ports, dtype=reading_dtype)
+        self.version = 0  # even: stable, odd: publish in progress
+
+    def publish(self, snapshot):
+        """Copies a ReadingSnapshot into the buffer. Called from one thread only."""
+        self.version += 1
+        np.copyto(self.array, snapshot.array)
+        self.version += 1
+
+    def read(self):
+        """Returns (version, ReadingSnapshot) with a consistent copy of the newest readings."""
+        while True:
+            version = self.version
+            if version & 1:  # publish in progress
+                time.sleep(0)
+                continue
+            array = self.array.copy()
+            if self.version == version:
+                return (version, ReadingSnapshot(len(array), array))
+
+    def read_if_changed(self, last_version):
+        """Returns (version, ReadingSnapshot) if readings were published after last_version, (last_version, None) otherwise."""
+        if self.version == last_version:
+            return (last_version, None)
+        return self.read()
@@ -0,0 +1,96 @@
+import time
+
+
+class PeriodicSchedule:
+    """Deadline-based periodic schedule.
+
+    Tick n is due at origin + n * period on the monotonic clock, so the time spent in a tick does not add to the period and the
+    rate does not drift. A tick that ends after the next deadline is an overrun; deadlines that already passed are skipped
+    instead of being run back to back.
+
+    Constructor takes: rate [Hz], clock (optional, returns seconds).
+
+    Example: schedule = PeriodicSchedule(10)
+             while True:
+                 work()
+                 time.sleep(schedule.next_delay())
+    """
+
+    def __init__(self, rate, clock=time.monotonic):
+        self.clock = clock
+        self.overruns = 0  # ticks that took longer than their period
+        self.skipped = 0  # deadlines skipped because of overruns
+        self.set_rate(rate)
+
+    def set_rate(self, rate):
+        """Changes the rate [Hz]. Schedule starts again from now."""
+        self.rate = rate
+        self.period = 1 / rate
+        self.origin = self.clock()
+        self.tick = 0
+
+    def next_delay(self):
+        """Moves to the next tick. Returns time [s] until it is due."""
+        now = self.clock()
+        self.tick += 1
+        deadline = self.origin + self.tick * self.period
+
+        if now > deadline:
+            self.overruns += 1
+            missed = int((now - deadline) / self.period) + 1
+            self.tick += missed
+            self.skipped += missed
+            deadline = self.origin + self.tick * self.period
+
+        return deadline - now
+
+
+class TkPeriodicTask:
+    """Periodic task in the Tk event loop on a PeriodicSchedule.
+
+    Calls callback at the given rate with after(). Only one timer is pending at any time, so starting the task twice or changing its rate
+    never runs callback twice per period.
+
+    Constructor takes: Tk widget, rate [Hz], callback.
+
+    Example: display = TkPeriodicTask(app, 5, app.update_widgets)
+             display.start()
+    """
+
+    def __init__(self, widget, rate, callback):
+        self.widget = widget
+        self.callback = callback
+        self.schedule = PeriodicSchedule(rate)
+        self.running = False
+        self._timer = None
+
+    def start(self):
+        """Runs the first tick as soon as the event loop is idle, then one per period."""
+        if not self.running:
+            self.running = True
+            self.schedule.set_rate(self.schedule.rate)
+            self._arm(0)
+
+    def stop(self):
+        self.running = False
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._timer = None
+
+    def set_rate(self, rate):
+        """Changes the rate [Hz], the next tick is one new period from now."""
+        self.schedule.set_rate(rate)
+        if self._timer is not None:
+            self.widget.after_cancel(self._timer)
+            self._arm(self.schedule.next_delay())
+
+    def _arm(self, delay):
+        self._timer = self.widget.after(max(0, int(round(delay * 1000))), self._run)
+
+    def _run(self):
+        self._timer = None
+        try:
+            self.callback()
+        finally:
+            if self.running and self._timer is None:  # not stopped or re-armed by callback
+                self._arm(self.schedule.next_delay())
@@ -0,0 +1,72 @@
+import contextlib
+import threading
+
+
+class SelectPin:
+    """SelectPin class.
+
+    adc_sel GPIO shared by several ports: high connects the ADCs to the voltage address of the photodiodes, low to the photodiode
+    signal. Ports read in parallel (on different I2C buses) hold the pin at the level they need. Holders of the same level share
+    the pin, a holder of the other level waits until they are done. Newcomers wait while someone waits for the other level, so
+    neither level starves.
+
+    Use SelectPin.get() to get the one instance of a GPIO.
+
+    Constructor takes: GPIO number.
+
+    Example: pin = SelectPin.get(17)
+             with pin.hold(rpi, False):
+                 read_signal()
+    """
+
+    pins = {}  # GPIO -> SelectPin
+    pins_lock = threading.Lock()
+
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.level = None
+        self.holders = 0
+        self.waiting = {True: 0, False: 0}
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def get(gpio):
+        with SelectPin.pins_lock:
+            if gpio not in SelectPin.pins:
+                SelectPin.pins[gpio] = SelectPin(gpio)
+            return SelectPin.pins[gpio]
+
+    def acquire(self, rpi, level):
+        """Waits until the pin can be held at level, writes it with pigpio connection rpi if needed."""
+        level = bool(level)
+        with self.condition:
+            self.waiting[level] += 1
+            while not (self.holders == 0 or (self.level == level and self.waiting[not level] == 0)):
+                self.condition.wait()
+            self.waiting[level] -= 1
+
+            if not self.level == level:
+                rpi.write(self.gpio, level)
+                self.level = level
+            self.holders += 1
+
+    def release(self):
+        with self.condition:
+            self.holders -= 1
+            if self.holders == 0:
+                self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def hold(self, rpi, level):
+        """Holds the pin at level in a with block."""
+        self.acquire(rpi, level)
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def forget(self):
+        """Forgets the written level, the next holder writes it again (e.g. after the GPIO was set up)."""
+        with self.condition:
+            self.level = None
+
@@ -0,0 +1,460 @@
+import os
+import queue
+import threading
+import time
+import zlib
+
+import journal
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# START
+# segment files
+
+extensions = {'none': '.csv', 'gzip': '.csv.gz', 'zstd': '.csv.zst'}
+
+
+def segment_compression(path):
+    """Returns compression of a segment according to its file name."""
+    for (compression, extension) in extensions.items():
+        if path.endswith(extension):
+            return compression
+    return 'none'
+
+
+def available_compression(compression):
+    """Returns compression that can be used on this system. Falls back to gzip if zstandard is not installed."""
+    if compression == 'zstd' and zstandard is None:
+        print('zstandard is not installed, using gzip compression.')
+        return 'gzip'
+    if compression not in extensions:
+        return 'none'
+    return compression
+
+
+def format_rates(rates):
+    """Returns set and achieved rates (see acquisition.Acquisition.rates) for the first header line, empty if they are unknown."""
+    if rates is None:
+        return ''
+    return (f' Acquisition {rates["acquisition rate"]} Hz (achieved {rates["achieved acquisition rate"]:.1f} Hz),'
+            f' logging {rates["logging rate"]} Hz (achieved {rates["achieved logging rate"]:.1f} Hz).')
+
+
+class SegmentFile:
+    """Segment file with optional streaming compression (gzip or zstd).
+
+    Compressed data is flushed in blocks by flush_block(), everything written before the last flushed block can be read back
+    even if the file is never closed (power cut). close() ends the compressed stream.
+
+    Constructor takes: path, compression ('none', 'gzip' or 'zstd').
+    """
+
+    def __init__(self, path, compression='none'):
+        self.file = open(path, 'wb')
+
+        if compression == 'gzip':
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 -> gzip header and trailer
+            self.block_mode = zlib.Z_FULL_FLUSH
+        elif compression == 'zstd':
+            self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+            self.block_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self.compressor = None
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        self.file.write(data)
+
+    def flush_block(self):
+        """Flushes compressed block and file buffers to the OS."""
+        if self.compressor is not None:
+            self.file.write(self.compressor.flush(self.block_mode))
+        self.file.flush()
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        """Ends the compressed stream, writes file to the disk and closes it."""
+        if self.compressor is not None:
+            self.file.write(self.compressor.flush())
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+# END
+
+
+class SessionLogger:
+    """Session logger.
+
+    Logs measured values of a session to a bounded local spool (SD card or tmpfs) instead of writing to the USB drive directly.
+    Writing is done in a background writer thread, so acquisition never waits for the storage.
+
+    Spool layout:
+        - <spool_dir>/<session>/<session>_0001.csv.part (segment being written)
+        - <spool_dir>/<session>/<session>_0001.csv.journal (write-ahead journal of the segment being written)
+        - <spool_dir>/<session>/<session>_0001.csv (completed segment, ready to be copied to USB by usbSync.UsbSync)
+
+    Each segment is a self-contained CSV file with its own header. Time column is continuous over all segments of a session.
+    Segments can be compressed with gzip (.csv.gz) or zstd (.csv.zst). Compression runs in the writer thread,
+    compressed blocks are flushed every block interval and at the end of every segment. Use logReader to read them.
+
+    Rows are appended to a journal (see journal.py) before they are written to the segment. The journal is made durable every
+    checkpoint interval, so at most checkpoint interval of values is lost on a power cut. Segments left unfinished by a power cut
+    are rebuilt from their journals and completed when the logger starts.
+
+    Additional sinks (see sessionStore.SessionStore) get the same sessions, rows and port settings from the writer thread.
+
+    Constructor takes: spool directory, spool limit in bytes, segment length in seconds, number of ports, compression,
+    block interval in seconds, checkpoint interval in seconds.
+
+    Example: logger = SessionLogger('spool', 256 * 2**20, 600)
+    """
+
+    def __init__(self, spool_dir='spool', spool_limit=256 * 2**20, segment_length=600, ports=4, compression='none', block_interval=10, checkpoint_interval=5):
+        self.spool_dir = spool_dir
+        self.spool_limit = spool_limit
+        self.segment_length = segment_length
+        self.ports = ports
+        self.compression = available_compression(compression)
+        self.block_interval = block_interval
+        self.checkpoint_interval = checkpoint_interval
+
+        self.session = None
+        self.session_time = ''
+        self.dropped_segments = 0
+        self.rates = None  # set and achieved rates (see acquisition.Acquisition.rates), written to segment headers
+        self.on_segment_complete = None  # callable(path), called from writer thread
+        self.sinks = []
+
+        self._claimed_segment = None  # completed segment being copied to USB, see claim_segment()
+        self._claim_lock = threading.Lock()
+
+        self._queue = queue.Queue()
+        self._file = None
+        self._journal = None
+        self._checkpoint_start = 0.
+        self._segment_path = ''
+        self._segment_index = 0
+        self._segment_start = 0.
+        self._block_start = 0.
+
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.recover()
+
+        self._writer = threading.Thread(target=self._run, name='session-logger', daemon=True)
+        self._writer.start()
+
+    def is_logging(self):
+        return self.session is not None
+
+    def add_sink(self, sink):
+        """Adds a sink that gets sessions, rows and port settings from the writer thread."""
+        self.sinks.append(sink)
+
+    def start_session(self, time_frame):
+        """Starts a new logging session. Takes time string used in file names and header."""
+        self.session = f'powermeter_{time_frame}'
+        self.session_time = time_frame
+        self._queue.put(('start', self.session, time_frame, 0))
+
+    def resume_session(self, time_frame, segment_index):
+        """Continues a session stopped earlier (e.g. by a restart of the app). New segments are numbered after segment_index."""
+        self.session = f'powermeter_{time_frame}'
+        self.session_time = time_frame
+        self._queue.put(('start', self.session, time_frame, segment_index))
+
+    def last_segment(self):
+        """Returns number of the last segment of the current or last session. Valid after flush() or close()."""
+        return self._segment_index
+
+    def log(self, measurement_time, entries):
+        """Queues one row for writing. Never blocks.
+
+        Takes: measurement_time (float) [s] since start of session, entries (list): (value, unit) per port or None for inactive port."""
+        if self.session is not None:
+            self._queue.put(('row', measurement_time, entries))
+
+    def log_settings(self, measurement_time, port, settings):
+        """Queues settings of a port for sinks. Takes dict with 'diode', 'wavelength', 'filter', 'filter factor', 'offset' and 'gain'."""
+        if self.session is not None:
+            self._queue.put(('settings', measurement_time, port, settings))
+
+    def stop_session(self):
+        """Ends current session. Current segment is completed and handed over for syncing."""
+        if self.session is not None:
+            self.session = None
+            self._queue.put(('stop',))
+
+    def flush(self, timeout=None):
+        """Waits until all queued commands are processed by the writer thread. Returns True if they were."""
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout=2.):
+        """Stops the session and the writer thread. Waits for queued rows to be written."""
+        self.stop_session()
+        self._queue.put(('close',))
+        self._writer.join(timeout)
+
+    def format_row(self, measurement_time, entries):
+        """Returns a CSV row for given entries."""
+        cells = [f'{measurement_time:.2f}']
+        for entry in entries:
+            if entry is None:
+                cells.extend([' ', ' '])
+            else:
+                cells.extend([f'{entry[0]}', f'{entry[1]}'])
+        return ','.join(cells) + '\n'
+
+    def list_completed_segments(self):
+        """Returns a sorted list of completed segment paths in the spool."""
+        segments = []
+        for session in sorted(os.listdir(self.spool_dir)):
+            session_dir = os.path.join(self.spool_dir, session)
+            if not os.path.isdir(session_dir):
+                continue
+            for name in sorted(os.listdir(session_dir)):
+                if name.endswith(tuple(extensions.values())):
+                    segments.append(os.path.join(session_dir, name))
+        return segments
+
+    def claim_segment(self, path):
+        """Marks a completed segment as being copied (see usbSync.UsbSync), the spool limit does not drop it until release_segment().
+
+        Returns False if the segment was dropped already."""
+        with self._claim_lock:
+            if not os.path.exists(path):
+                return False
+            self._claimed_segment = path
+            return True
+
+    def release_segment(self):
+        with self._claim_lock:
+            self._claimed_segment = None
+
+    def spool_size(self):
+        """Returns size of all files in the spool in bytes."""
+        size = 0
+        for root, dirs, files in os.walk(self.spool_dir):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return size
+
+    def recover(self):
+        """Completes segments left unfinished by a power cut or crash. Segments are rebuilt from their journals."""
+        for session in sorted(os.listdir(self.spool_dir)):
+            session_dir = os.path.join(self.spool_dir, session)
+            if not os.path.isdir(session_dir):
+                continue
+
+            for name in sorted(os.listdir(session_dir)):
+                path = os.path.join(session_dir, name)
+                try:
+                    if name.endswith('.journal'):
+                        segment_path = path[:-len('.journal')]
+                        records = journal.recover(path)
+
+                        segment = SegmentFile(segment_path + '.part', segment_compression(segment_path))
+                        for (record_type, data) in records:
+                            if record_type in (journal.HEADER, journal.ROWS):
+                                segment.write(data.decode('utf-8'))
+                        segment.close()
+
+                        os.replace(segment_path + '.part', segment_path)
+                        journal.sync_directory(session_dir)
+                        os.remove(path)
+                        print('Recovered log segment:', segment_path)
+
+                    elif name.endswith('.part') and os.path.exists(path) and not os.path.exists(path[:-len('.part')] + '.journal'):
+                        # no journal, segment is kept as it is
+                        os.replace(path, path[:-len('.part')])
+
+                except OSError as e:
+                    print('An error occurred while recovering a segment:', e)
+
+        return
+
+    # START
+    # writer thread
+
+    def _run(self):
+        """Writer thread. An error of one command is reported and the thread goes on, so the queue is always emptied."""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.checkpoint_interval)
+            except queue.Empty:
+                self._checkpoint()
+                continue
+            rows = []
+
+            # collects all queued rows into one write
+            while True:
+                if item[0] == 'row':
+                    rows.append(item)
+                else:
+                    self._write_rows(rows)
+                    rows = []
+                    try:
+                        self._execute(item)
+                    except Exception as e:
+                        print(f'An error occurred in the session logger ({item[0]}):', e)
+                    finally:
+                        if item[0] == 'flush':
+                            item[1].set()
+                    if item[0] == 'close':
+                        return
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self._write_rows(rows)
+
+    def _execute(self, item):
+        """Executes a queued command other than a row."""
+        if item[0] == 'start':
+            self._complete_segment()
+            self._session = item[1]
+            self._session_time = item[2]
+            self._segment_index = item[3]
+            self._call_sinks('start_session', item[1], item[2])
+        elif item[0] == 'settings':
+            self._call_sinks('write_settings', item[1], item[2], item[3])
+        elif item[0] == 'stop':
+            self._complete_segment()
+            self._call_sinks('stop_session')
+        elif item[0] == 'flush':
+            self._call_sinks('flush')
+        elif item[0] == 'close':
+            self._complete_segment()
+            self._call_sinks('close')
+
+    def _call_sinks(self, method, *args):
+        """Calls a method of every sink. A failing sink is reported, the others and the spool are still written."""
+        for sink in self.sinks:
+            try:
+                getattr(sink, method)(*args)
+            except Exception as e:
+                print(f'An error occurred in sink {type(sink).__name__} ({method}):', e)
+
+    def _write_rows(self, rows):
+        if rows == []:
+            return
+
+        self._call_sinks('write_rows', [(r[1], r[2]) for r in rows])
+
+        try:
+            if self._file is None:
+                self._open_segment()
+            elif time.monotonic() - self._segment_start >= self.segment_length:
+                self._complete_segment()
+                self._open_segment()
+
+            text = ''.join(self.format_row(r[1], r[2]) for r in rows)
+            self._journal.append(journal.ROWS, text.encode('utf-8'))
+            self._file.write(text)
+
+            if time.monotonic() - self._checkpoint_start >= self.checkpoint_interval:
+                self._checkpoint()
+
+            if self.compression == 'none' or time.monotonic() - self._block_start >= self.block_interval:
+                self._file.flush_block()
+                self._block_start = time.monotonic()
+        except Exception as e:  # OSError of the storage, or a segment that could not be opened
+            print('An error occurred while writing to spool:', e)
+
+    def _open_segment(self):
+        self._segment_index += 1
+        session_dir = os.path.join(self.spool_dir, self._session)
+        os.makedirs(session_dir, exist_ok=True)
+
+        self._segment_path = os.path.join(session_dir, f'{self._session}_{self._segment_index:04d}{extensions[self.compression]}')
+        # segment and journal are opened together, a segment is never written without its journal
+        segment = SegmentFile(self._segment_path + '.part', self.compression)
+        try:
+            segment_journal = journal.Journal(self._segment_path + '.journal')
+        except Exception:
+            segment.file.close()
+            try:
+                os.remove(self._segment_path + '.part')
+            except OSError:
+                pass
+            self._segment_index -= 1
+            raise
+        (self._file, self._journal) = (segment, segment_journal)
+
+        header = f'PowerMeter: FOLAS -> log @ {self._session_time}, segment {self._segment_index}.{format_rates(self.rates)}\n' + \
+            'Time [s], ' + ', '.join(f'Port {p + 1}, / ' for p in range(self.ports)) + '\n'
+        self._journal.append(journal.HEADER, header.encode('utf-8'))
+        self._file.write(header)
+
+        journal.sync_directory(session_dir)
+        self._segment_start = time.monotonic()
+        self._block_start = self._segment_start
+        self._checkpoint_start = self._segment_start
+
+    def _checkpoint(self):
+        """Makes the journal of the current segment durable. Sinks write their buffered rows."""
+        self._call_sinks('flush')
+
+        if self._journal is None:
+            return
+
+        try:
+            self._journal.checkpoint()
+        except OSError as e:
+            print('An error occurred while writing a checkpoint:', e)
+        self._checkpoint_start = time.monotonic()
+
+    def _complete_segment(self):
+        if self._file is None:
+            return
+
+        try:
+            self._file.close()
+            os.replace(self._segment_path + '.part', self._segment_path)
+            journal.sync_directory(os.path.dirname(self._segment_path))
+            self._journal.close(remove=True)
+        except OSError as e:
+            print('An error occurred while completing a segment:', e)
+        self._file = None
+        self._journal = None
+
+        self._enforce_limit()
+
+        if self.on_segment_complete is not None:
+            self.on_segment_complete(self._segment_path)
+
+    def _enforce_limit(self):
+        """Drops the oldest completed segments if the spool grows over its limit (USB drive missing for a long time).
+
+        The segment being copied to USB is kept, it leaves the spool once it is copied."""
+        segments = self.list_completed_segments()
+        size = self.spool_size()
+
+        while size > self.spool_limit and segments:
+            oldest = segments.pop(0)
+            with self._claim_lock:
+                if oldest == self._claimed_segment:
+                    continue
+                try:
+                    size -= os.path.getsize(oldest)
+                    os.remove(oldest)
+                    self.dropped_segments += 1
+                    print('Spool is full, dropped segment:', oldest)
+                except OSError:
+                    pass
+
+    # END
@@ -0,0 +1,179 @@
+import sqlite3
+import datetime
+
+
+unit_scale = {'W': 1, 'mW': 1e-3, 'uW': 1e-6, 'nW': 1e-9, 'pW': 1e-12, 'V': 1}
+
+schema = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE,
+    started TEXT,
+    stopped TEXT
+);
+CREATE TABLE IF NOT EXISTS port_settings (
+    session INTEGER REFERENCES sessions (id),
+    port INTEGER,
+    time REAL,
+    diode TEXT COLLATE NOCASE,
+    wavelength INTEGER,
+    filter TEXT,
+    filter_factor REAL,
+    offset REAL,
+    gain TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    session INTEGER REFERENCES sessions (id),
+    port INTEGER,
+    time REAL,
+    power REAL,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_session_port_time ON samples (session, port, time);
+CREATE INDEX IF NOT EXISTS port_settings_search ON port_settings (diode, wavelength, port);
+CREATE INDEX IF NOT EXISTS port_settings_session ON port_settings (session, port, time);
+"""
+
+
+class SessionStore:
+    """SQLite session store.
+
+    Optional sink of sessionLogger.SessionLogger. Stores samples and per-port settings (diode name, wavelength, filter, offset, gain)
+    of every session in a local SQLite database in WAL mode, so measurements can be searched across sessions.
+    Samples are buffered and inserted in one transaction per batch.
+
+    All writing methods are called from the logger's writer thread. Database is opened on the first write, in that thread.
+
+    Constructor takes: path of the database, number of rows per transaction.
+
+    Example: logger.add_sink(SessionStore('sessions.db'))
+             store.find_sessions(port=2, diode='PS100-7', wavelength=1030)
+    """
+
+    def __init__(self, path='sessions.db', batch_rows=1000):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.session_id = None
+        self._connection = None
+        self._samples = []
+
+    def connect(self):
+        """Returns a connection to the database. Creates tables and indexes if needed."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.executescript(schema)
+        return self._connection
+
+    # START
+    # sink interface, called by SessionLogger
+
+    def start_session(self, name, time_frame):
+        try:
+            with self.connect() as connection:
+                cursor = connection.execute('INSERT OR IGNORE INTO sessions (name, started) VALUES (?, ?)',
+                                            (name, f'{datetime.datetime.now()}'))
+                self.session_id = cursor.lastrowid
+                if cursor.rowcount == 0:  # resumed session
+                    self.session_id = connection.execute('SELECT id FROM sessions WHERE name = ?', (name,)).fetchone()[0]
+        except sqlite3.Error as e:
+            print('An error occurred while writing to session store:', e)
+
+    def write_settings(self, measurement_time, port, settings):
+        """Stores settings of a port, valid from measurement_time on."""
+        if self.session_id is None:
+            return
+        self.flush()
+        try:
+            with self.connect() as connection:
+                connection.execute('INSERT INTO port_settings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                   (self.session_id, port, measurement_time, settings['diode'], settings['wavelength'],
+                                    settings['filter'], settings['filter factor'], settings['offset'], f"{settings['gain']}"))
+        except sqlite3.Error as e:
+            print('An error occurred while writing to session store:', e)
+
+    def write_rows(self, rows):
+        """Buffers rows (time, entries) for insertion. Inserts them when a batch is full."""
+        if self.session_id is None:
+            return
+
+        for (measurement_time, entries) in rows:
+            for (port, entry) in enumerate(entries):
+                if entry is None:
+                    continue
+                try:
+                    power = float(entry[0]) * unit_scale.get(entry[1], 1)
+                except ValueError:
+                    continue
+                self._samples.append((self.session_id, port, measurement_time, power, entry[1]))
+
+        if len(self._samples) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """Inserts buffered samples in one transaction."""
+        if self._samples == []:
+            return
+        try:
+            with self.connect() as connection:
+                connection.executemany('INSERT INTO samples VALUES (?, ?, ?, ?, ?)', self._samples)
+            self._samples = []
+        except sqlite3.Error as e:
+            print('An error occurred while writing to session store:', e)
+
+    def stop_session(self):
+        self.flush()
+        if self.session_id is None:
+            return
+        try:
+            with self.connect() as connection:
+                connection.execute('UPDATE sessions SET stopped = ? WHERE id = ?', (f'{datetime.datetime.now()}', self.session_id))
+        except sqlite3.Error as e:
+            print('An error occurred while writing to session store:', e)
+        self.session_id = None
+
+    def close(self):
+        self.stop_session()
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    # END
+
+    # START
+    # queries, use a separate SessionStore (connection) than the one writing
+
+    def find_sessions(self, port=None, diode=None, wavelength=None):
+        """Returns sessions (id, name, started, stopped) that had given port, diode and wavelength set at some point. Port numbers start with 1."""
+        conditions = []
+        parameters = []
+        if port is not None:
+            conditions.append('port_settings.port = ?')
+            parameters.append(port - 1)
+        if diode is not None:
+            conditions.append('port_settings.diode = ?')
+            parameters.append(diode)
+        if wavelength is not None:
+            conditions.append('port_settings.wavelength = ?')
+            parameters.append(wavelength)
+
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        return self.connect().execute(
+            'SELECT DISTINCT sessions.id, sessions.name, sessions.started, sessions.stopped FROM sessions '
+            'JOIN port_settings ON port_settings.session = sessions.id ' + where + ' ORDER BY sessions.id',
+            parameters).fetchall()
+
+    def samples(self, session_id, port, start=None, stop=None):
+        """Returns samples (time, power in W, unit) of a session port (numbered from 1) with start <= time < stop."""
+        query = 'SELECT time, power, unit FROM samples WHERE session = ? AND port = ?'
+        parameters = [session_id, port - 1]
+        if start is not None:
+            query += ' AND time >= ?'
+            parameters.append(start)
+        if stop is not None:
+            query += ' AND time < ?'
+            parameters.append(stop)
+        return self.connect().execute(query + ' ORDER BY time', parameters).fetchall()
+
+    # END
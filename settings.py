@@ -0,0 +1,176 @@
+import os
+import threading
+
+import yaml
+
+
+# libyaml parser is several times faster, used when PyYAML is built with it
+Loader = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+
+# state of the app (saved settings, spool, snapshot) is kept outside the release that runs, see updateService.supervise
+data_directory = os.environ.get('POWERMETER_DATA', '')
+
+_cache = {}  # path -> (modification time, contents)
+_cache_locks = {}  # path -> Lock, held while the file is parsed
+_cache_lock = threading.Lock()
+
+# rates set on the settings page and kept in last_settings.yaml, (lowest, highest) [Hz]
+# a port read takes at least ~65 ms (voltage address and signal settling, amplifier delay), faster rates can not be reached;
+# with more ports on a bus the achieved rate is lower still, it is shown next to the set rate (see acquisition.Acquisition.rates)
+rate_limits = {'refresh rate': (1, 10),  # display
+               'acquisition rate': (1, 15),
+               'logging rate': (1, 15)}
+
+
+def data_path(path):
+    """Returns path of a file with state of the app. Relative paths are in the data directory (app directory by default)."""
+    return os.path.join(data_directory, path)
+
+
+def load_yaml(path):
+    """Returns contents of a YAML file."""
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=Loader)
+
+
+def load_cached(path):
+    """Returns contents of a YAML file, shared by all callers. File is parsed again only when it was modified.
+
+    Returned data must not be changed."""
+    with _cache_lock:
+        lock = _cache_locks.setdefault(path, threading.Lock())
+
+    with lock:
+        mtime = os.stat(path).st_mtime
+        cached = _cache.get(path)
+        if cached is None or not cached[0] == mtime:
+            cached = (mtime, load_yaml(path))
+            _cache[path] = cached
+        return cached[1]
+
+
+def preload(*paths):
+    """Parses YAML files into the cache in a background thread. Callers of load_cached wait for the parse in progress."""
+
+    def parse():
+        for path in paths:
+            try:
+                load_cached(path)
+            except Exception as e:
+                print(f'An error occurred while loading {path}:', e)
+
+    thread = threading.Thread(target=parse, name='preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def load_config(path='config.yaml'):
+    return load_cached(path)
+
+
+def load_last_settings(path='last_settings.yaml'):
+    """Returns saved settings. Missing file is treated as no saved settings."""
+    try:
+        saved_set = load_yaml(data_path(path))
+    except FileNotFoundError:
+        saved_set = None
+    return saved_set if saved_set else {'last setting': {}}
+
+
+def save_last_settings(saved_set, rates, path='last_settings.yaml'):
+    """Writes rates to last_settings.yaml. Other saved settings are kept."""
+    saved_set.setdefault('last setting', {}).update(rates)
+    with open(data_path(path), 'w') as file:
+        yaml.dump(saved_set, file, default_flow_style=False,
+                  allow_unicode=True)
+
+
+def default_rates(data):
+    return {name: data['defaults'][name] for name in rate_limits}
+
+
+def saved_rates(data, saved_set):
+    """Returns display, acquisition and logging rates. Saved rates override defaults from config, all are kept within rate_limits."""
+    saved = saved_set.get('last setting', {})
+    return {name: min(max(saved.get(name, rate), rate_limits[name][0]), rate_limits[name][1])
+            for (name, rate) in default_rates(data).items()}
+
+
+def port_count(data):
+    """Returns number of photodiode ports in config."""
+    return len(data['diode ports'])
+
+
+def discover_ports(data):
+    """Returns config with ports found on the I2C buses added after its diode ports, if port discovery is enabled (see i2cScan.py).
+
+    Buses of the configured ports and the buses of the discovery section are scanned. Configured ports are kept as they are
+    (order, bus, select pin), so their numbers and log columns never change. Config is returned as it is if discovery is
+    disabled or finds no new ports."""
+    discovery = data.get('port discovery', {})
+    if not discovery.get('enabled', False):
+        return data
+
+    import i2cScan
+    from Diode import Diode
+
+    buses = sorted({port.get('bus', Diode.BUS) for port in data['diode ports'].values()} | set(discovery.get('buses') or []))
+    found = i2cScan.discover(buses, Diode.connect, data_path(discovery['cache']))
+    ports = i2cScan.merge_ports(data['diode ports'], found, discovery.get('select pins'))
+    if len(ports) == len(data['diode ports']):
+        return data
+    print(f'{len(ports) - len(data["diode ports"])} port(s) found on I2C buses {buses} that are not in config, they are added.')
+    return dict(data, **{'diode ports': ports})  # cached config is not changed
+
+
+def create_diodes(data):
+    """Creates Diodes of the ports in config and opens their I2C devices, connects to pigpio daemon on first use. Returns dict port index -> Diode.
+
+    Ports are numbered in the order of diode ports in config, any number of them. Ports that can not be set up are reported and left out.
+    I2C bus and adc_sel GPIO of a port are optional in config (bus 1, GPIO 17 by default)."""
+    from Diode import Diode
+
+    diodes = {}
+    for (port, port_config) in enumerate(data['diode ports'].values()):
+        address = port_config['i2c address']
+        try:
+            diode = Diode(address['adc'], address['tca'], port_config.get('bus', Diode.BUS), port_config.get('select pin', Diode.adc_sel_pin))
+            diode.set_i2c()
+            diodes[port] = diode
+        except Exception as e:
+            print(f'Port {port + 1} (bus {port_config.get("bus", Diode.BUS)}, adc {hex(address["adc"])}, tca {hex(address["tca"])}) '
+                  f'could not be set up:', e)
+
+    return diodes
+
+
+def close_diodes(diodes):
+    """Releases I2C handles of diodes (dict port index -> Diode) and closes pigpio connections."""
+    from Diode import Diode
+
+    for diode in diodes.values():
+        diode.close()
+    Diode.disconnect()
+
+
+def create_logger(log_config, ports=4):
+    """Creates the session logger with its local spool and the USB sync worker from the logging section of config and number of ports.
+
+    Returns: (SessionLogger, UsbSync)."""
+    from sessionLogger import SessionLogger
+    from usbSync import UsbSync
+
+    logger = SessionLogger(data_path(log_config['spool directory']),
+                           log_config['spool limit'] * 2**20,
+                           log_config['segment length'],
+                           ports,
+                           compression=log_config['compression'],
+                           block_interval=log_config['block interval'],
+                           checkpoint_interval=log_config['checkpoint interval'])
+    usb_sync = UsbSync(logger, log_config['sync retry'])
+
+    if not log_config['database'] == '':
+        from sessionStore import SessionStore
+        logger.add_sink(SessionStore(data_path(log_config['database'])))
+
+    return (logger, usb_sync)
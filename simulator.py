@@ -0,0 +1,223 @@
+"""Simulated powermeter hardware.
+
+SimulatedPi stands in for pigpio.pi: it answers I2C reads of the ADCs and writes to the I/O Expanders of the ports like the real
+boards, so Diode, Acquisition and the apps run without a Raspberry Pi or photodiodes.
+
+Self-test: python3 simulator.py --self-test
+Imports all modules of the app and reads every port in config through the simulator. Used to check a staged update before it is
+switched to (see updateService.stage_update). Exit code is 0 if all checks pass.
+"""
+
+import argparse
+import math
+import sys
+
+
+class SimulatedPort:
+    """Photodiode on a simulated port.
+
+    Constructor takes: I/O Expander address, voltage address [V] (identifies the photodiode, see diodes in config), photocurrent [A],
+    adc_sel pin (optional).
+    """
+
+    def __init__(self, tca_add, voltage_address, current=1e-6, sel_pin=17):
+        self.tca_add = tca_add
+        self.voltage_address = voltage_address
+        self.current = current
+        self.sel_pin = sel_pin
+        self.amplification = 0
+        self.failing = False  # ADC does not answer, e.g. a loose port board
+
+
+class SimulatedPi:
+    """Simulated pigpio.pi of the powermeter.
+
+    ADC reads return the voltage address of the photodiode while the adc_sel pin is high, otherwise the photocurrent times the
+    resistor of the amplification set on the I/O Expander, limited to the ADC reference.
+
+    Constructor takes: ports (dict (I2C bus, ADC address) -> SimulatedPort), resistors (dict amplification -> resistance [Ohm]).
+
+    Example: rpi = SimulatedPi.from_config(settings.load_config())
+             Diode.shared_rpi = rpi  # before the first Diode.set_i2c()
+    """
+
+    int_ref_adc = 2.048
+    tca_out_reg = 0x01
+    read_failed = -83  # pigpio PI_I2C_READ_FAILED, device did not acknowledge
+
+    def __init__(self, ports, resistors):
+        self.ports = ports
+        self.resistors = resistors
+        self.connected = True
+        self.levels = {}
+        self.handles = {}  # handle -> (I2C bus, I2C address)
+        self.next_handle = 0
+
+    @staticmethod
+    def from_config(data, calibration=None, current=1e-6):
+        """Returns a SimulatedPi with a photodiode from config on every port. Only calibrated photodiodes are used if calibration is given."""
+        addresses = [float(key[1:]) for (key, diode) in data['diodes'].items()
+                     if calibration is None or diode['name'] in calibration['diodes']]
+        ports = {}
+        for (i, port) in enumerate(data['diode ports'].values()):
+            address = port['i2c address']
+            ports[(port.get('bus', 1), address['adc'])] = SimulatedPort(address['tca'], addresses[i % len(addresses)], current,
+                                                                         port.get('select pin', 17))
+        resistors = {int(amp): resistance for (amp, resistance) in data['resistors'].items()}
+        return SimulatedPi(ports, resistors)
+
+    def port_of(self, handle):
+        (bus, address) = self.handles.get(handle, (None, None))
+        for ((port_bus, adc_add), port) in self.ports.items():
+            if port_bus == bus and address in (adc_add, port.tca_add):
+                return port
+        return None
+
+    def set_mode(self, gpio, mode):
+        return 0
+
+    def write(self, gpio, level):
+        self.levels[gpio] = bool(level)
+        return 0
+
+    def read(self, gpio):
+        return int(self.levels.get(gpio, False))
+
+    def i2c_open(self, bus, address, flags=0):
+        handle = self.next_handle
+        self.next_handle += 1
+        self.handles[handle] = (bus, address)
+        return handle
+
+    def i2c_close(self, handle):
+        self.handles.pop(handle, None)
+        return 0
+
+    def i2c_write_byte(self, handle, value):
+        return 0
+
+    def i2c_write_byte_data(self, handle, register, value):
+        port = self.port_of(handle)
+        if port is not None and self.handles[handle][1] == port.tca_add and register == SimulatedPi.tca_out_reg:
+            port.amplification = value
+        return 0
+
+    def i2c_write_i2c_block_data(self, handle, register, data):
+        return 0
+
+    def i2c_read_byte_data(self, handle, register):
+        return 0 if self.port_of(handle) is not None else SimulatedPi.read_failed
+
+    def i2c_read_word_data(self, handle, register):
+        return 0x8583 if self.port_of(handle) is not None else SimulatedPi.read_failed
+
+    def i2c_read_device(self, handle, count):
+        port = self.port_of(handle)
+        if port is None or port.failing or self.handles[handle][1] == port.tca_add:
+            return (SimulatedPi.read_failed, bytearray())
+
+        if self.levels.get(port.sel_pin, False):
+            voltage = port.voltage_address
+        else:
+            voltage = min(port.current * self.resistors[port.amplification], SimulatedPi.int_ref_adc)
+
+        raw = int(voltage / SimulatedPi.int_ref_adc * ((2**15) - 1))
+        return (count, bytearray(raw.to_bytes(2, 'big', signed=True)))
+
+    def stop(self):
+        self.connected = False
+
+
+def self_test():
+    """Imports the app and reads all ports of config through the simulator. Returns a list of failed checks."""
+    import settings
+    import i2cScan
+    from Diode import Diode
+    from acquisition import Acquisition
+    from measurementLog import format_power
+    import main  # GUI module, checks that it imports, no window is created
+
+    data = settings.load_config()
+    rpi = SimulatedPi.from_config(data, settings.load_cached('calibration.yaml'))
+    Diode.shared_rpi = rpi
+    delay = Diode.delay
+    Diode.delay = 0  # no settling time of the simulated amplifier, except for the auto range check below
+
+    errors = []
+    buses = sorted({port.get('bus', Diode.BUS) for port in data['diode ports'].values()})
+    found = i2cScan.port_table(i2cScan.scan(buses, Diode.connect))
+    configured = sorted((port.get('bus', Diode.BUS), port['i2c address']['adc']) for port in data['diode ports'].values())
+    if not sorted((port['bus'], port['i2c address']['adc']) for port in found.values()) == configured:
+        errors.append(f'I2C scan found {len(found)} port(s), config lists {len(configured)}')
+
+    diodes = settings.create_diodes(data)
+    if not len(diodes) == len(data['diode ports']):
+        errors.append(f'{len(data["diode ports"]) - len(diodes)} port(s) of config could not be set up')
+
+    acquisition = Acquisition(diodes)
+    active = acquisition.check_diodes()
+    if not active == sorted(diodes):
+        errors.append(f'ports {[port + 1 for port in sorted(set(diodes) - set(active))]} not detected')
+
+    sample = acquisition.read_once()
+    for port in active:
+        reading = sample.readings.get(port)
+        if reading is None:
+            errors.append(f'port {port + 1} was not read')
+        elif not (math.isfinite(reading['power']) and reading['power'] > 0):
+            errors.append(f'port {port + 1} converted to {reading["power"]}')
+        elif reading['unit'] not in Diode.units:
+            errors.append(f'port {port + 1} has unit {reading["unit"]}')
+        else:
+            format_power(reading)
+
+    (version, readings) = acquisition.buffer.read_if_changed(0)
+    if readings is None or not dict(readings) == dict(sample.readings):
+        errors.append('snapshot buffer does not hold the newest readings')
+    elif acquisition.buffer.read_if_changed(version)[1] is not None:
+        errors.append('snapshot buffer reports a change without a new sample')
+
+    # a failing port is quarantined and marked, it stays active while the others are still read
+    failing = list(rpi.ports.values())[0]
+    failing.failing = True
+    acquisition = Acquisition(diodes, port_errors={'timeout': None, 'retries': 1, 'backoff': 0., 'cooldown': 60.})
+    sample = acquisition.read_once()
+    if not acquisition.guards[0].is_quarantined():
+        errors.append('failing port 1 was not quarantined')
+    if not sorted(sample.readings) == active[1:]:
+        errors.append(f'ports {[port + 1 for port in sample.readings]} were read with port 1 failing')
+    sample = acquisition.read_once()
+    if 0 not in sample.ports or not sample.readings.errors() == [0]:
+        errors.append('quarantined port 1 was not kept among the active ports with an error')
+    failing.failing = False
+
+    # a dark port sweeps all amplifications with the real settling time, within the deadline of config
+    Diode.delay = delay
+    dark = list(rpi.ports.values())[0]
+    dark.current = 1e-15
+    diode = diodes[active[0]]
+    diode.amp_bit_dg408 = 0x00
+    acquisition = Acquisition({active[0]: diode}, port_errors=data.get('port errors'))
+    sample = acquisition.read_once()
+    if acquisition.error_counts()['errors'] or active[0] not in sample.readings:
+        errors.append(f'auto range sweep of dark port 1 failed: {acquisition.error_counts()}')
+    dark.current = 1e-6
+
+    return errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulated powermeter hardware.')
+    parser.add_argument('--self-test', action='store_true', help='read all ports of config through the simulator, exit code 1 on failure')
+    args = parser.parse_args()
+
+    if args.self_test:
+        try:
+            errors = self_test()
+        except Exception as e:
+            errors = [f'{type(e).__name__}: {e}']
+        for error in errors:
+            print('Self-test failed:', error)
+        if errors == []:
+            print('Self-test passed.')
+        sys.exit(1 if errors else 0)
@@ -0,0 +1,88 @@
+"""State of the app kept over a restart (e.g. after an update).
+
+Before the restart, settings of every port (wavelength, filter, offset, manual gain or auto range) and the logging session are
+written to snapshot.yaml in the data directory (see settings.data_path). The restarted app takes the snapshot once, applies it and continues the same logging session.
+Ports are matched by their I2C bus and ADC address, so a snapshot stays valid if ports are numbered differently.
+"""
+
+import os
+import time
+
+import yaml
+
+from settings import data_path
+
+
+def port_state(diode):
+    """Returns settings of a diode that are kept over a restart."""
+    return {'wavelength': diode.get_wavelength(),
+            'filter': diode.get_multiply_factor_string(),
+            'filter factor': diode.get_multiply_factor(),
+            'offset': diode.offset,
+            'auto range': diode.get_auto_range(),
+            'amplification': diode.get_amplification()}
+
+
+def restore_port(diode, state):
+    """Applies settings returned by port_state(). Manual gain is written to the I/O Expander, call it from the thread that owns the hardware."""
+    diode.set_wavelength(state['wavelength'])
+    diode.set_multiply_factor(state['filter factor'])
+    diode.set_multiply_factor_string(state['filter'])
+    diode.set_offset(state['offset'])
+    if state['auto range']:
+        diode.toggle_true_auto_range()
+    else:
+        diode.set_amplification(state['amplification'])
+
+
+def port_key(diode):
+    return f'{diode.bus}/{hex(diode.get_adc_address())}'
+
+
+def capture(diodes, log_state):
+    """Returns a snapshot of diodes (dict port index -> Diode) and logging state (see measurementLog.MeasurementLog.suspend)."""
+    return {'time': time.time(),
+            'ports': {port_key(diode): port_state(diode) for diode in diodes.values()},
+            'logging': log_state}
+
+
+def save(state, path='snapshot.yaml'):
+    """Writes a snapshot. File is replaced as a whole, so a restart never finds half of it."""
+    path = data_path(path)
+    try:
+        with open(path + '.tmp', 'w') as file:
+            yaml.safe_dump(state, file, default_flow_style=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(path + '.tmp', path)
+    except OSError as e:
+        print('An error occurred while writing snapshot:', e)
+        return False
+    return True
+
+
+def take(path='snapshot.yaml', max_age=60.):
+    """Reads and removes the snapshot. Returns None if there is none or it is older than max_age [s] (e.g. left by a crash)."""
+    path = data_path(path)
+    try:
+        with open(path, 'r') as file:
+            state = yaml.safe_load(file)
+        os.remove(path)
+    except (OSError, yaml.YAMLError):
+        return None
+
+    if not isinstance(state, dict) or time.time() - state.get('time', 0) > max_age:
+        return None
+    return state
+
+
+def restore(state, diodes):
+    """Applies port settings of a snapshot to diodes (dict port index -> Diode) with the same I2C bus and ADC address."""
+    for diode in diodes.values():
+        port = state['ports'].get(port_key(diode))
+        if port is None:
+            continue
+        try:
+            restore_port(diode, port)
+        except Exception as e:
+            print('An error occurred while restoring port settings:', e)
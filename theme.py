@@ -0,0 +1,35 @@
+# Fonts and colors of the powermeter GUI.
+
+# START
+# definition of fonts
+normal = "Lato 18"
+titles = "Lato 22 bold"
+outputfont = "Lato 36 bold"
+outputminifont = "Lato 16 bold"
+normalminifont = "Lato 16"
+menufont = "Lato 16 bold"
+settingsfont = "Lato 14"
+ampfont = "Lato 12"
+# END
+
+ptomm = 0.19375  # pixel size in [mm]
+
+# START
+# definition of colors
+teal = '#538083'
+red = '#E3170A'
+light_gray = '#CDD6D0'
+dark_gray = '#89909f'
+black = '#13070c'
+orange = '#E16036'
+space_blue = '#0d0f16'
+dark_blue = '#767b91'
+light_blue = '#c7ccdb'
+white_ish = '#e1e5ee'
+
+# OVERWRITE to monochrome/grayscale verion
+black = space_blue = dark_blue = '#13070C'
+teal = orange = red = '#000000'
+dark_gray = light_gray = '#D2D1D0'
+light_blue = white_ish = '#DBDBDB'  # '#FFFFFF'
+# END
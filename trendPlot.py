@@ -0,0 +1,134 @@
+import tkinter as tk
+import numpy as np
+from theme import *
+
+
+unit_scale = {'W': 1, 'mW': 1e-3, 'uW': 1e-6, 'nW': 1e-9, 'pW': 1e-12, 'V': 1}
+
+
+class HistoryBuffer:
+    """Fixed-size ring buffer of measured values of one port.
+
+    Keeps the newest capacity samples (time [s], value in W or V) in preallocated NumPy arrays, appending never allocates.
+
+    Constructor takes: capacity (number of samples).
+
+    Example: history = HistoryBuffer(36000)  # one hour at 10 Hz
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.time = np.zeros(capacity)
+        self.value = np.zeros(capacity)
+        self.count = 0  # number of samples ever appended
+
+    def append(self, t, value, unit):
+        """Appends a sample. Takes time [s], value and its unit."""
+        i = self.count % self.capacity
+        self.time[i] = t
+        self.value[i] = value * unit_scale.get(unit, 1)
+        self.count += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def since(self, start):
+        """Returns (time, value) arrays of samples with time >= start, oldest first."""
+        n = len(self)
+        end = self.count % self.capacity
+        if n < self.capacity:
+            (time, value) = (self.time[:n], self.value[:n])
+        else:  # buffer is full, oldest sample is at end
+            (time, value) = (np.roll(self.time, -end), np.roll(self.value, -end))
+
+        first = np.searchsorted(time, start)
+        return (time[first:], value[first:])
+
+
+def decimate_minmax(time, value, start, stop, width):
+    """Reduces samples to at most two points (min and max) per pixel column.
+
+    Returns (x, y) arrays of pixel columns and values. The reduced line looks the same as the full one at given width."""
+    if len(time) == 0:
+        return (np.zeros(0), np.zeros(0))
+
+    column = ((time - start) / max(stop - start, 1e-9) * (width - 1)).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(column)) + 1))
+
+    x = np.repeat(column[starts], 2)
+    y = np.empty(2 * len(starts))
+    y[0::2] = np.minimum.reduceat(value, starts)
+    y[1::2] = np.maximum.reduceat(value, starts)
+    return (x, y)
+
+
+def format_value(value):
+    """Returns value in W as string with an appropriate unit."""
+    for (unit, scale) in (('W', 1), ('mW', 1e-3), ('uW', 1e-6), ('nW', 1e-9)):
+        if abs(value) >= scale:
+            return f'{value / scale:.3g} {unit}'
+    return f'{value / 1e-12:.3g} pW'
+
+
+class TrendPlot:
+    """Trend plot of one port on a Tk Canvas.
+
+    Line and labels are created once and updated in place every frame. Samples are decimated to the width of the canvas
+    before drawing, so drawing cost does not depend on the length of the history.
+
+    Constructor takes: parent widget, HistoryBuffer, width and height in pixels.
+
+    Example: plot = TrendPlot(window, history, 600, 300)
+             plot.draw(now, 600)  # last 10 minutes
+    """
+
+    margin = 60  # [px] left margin for labels
+
+    def __init__(self, parent, history, width, height):
+        self.history = history
+        self.width = width
+        self.height = height
+
+        self.canvas = tk.Canvas(parent,
+                                width=width,
+                                height=height,
+                                bg=white_ish,
+                                highlightthickness=0)
+
+        self.line = self.canvas.create_line(0, 0, 0, 0, fill=space_blue, width=1)
+        self.top_label = self.canvas.create_text(4, 4, anchor='nw', fill=space_blue, font=ampfont, text='')
+        self.bottom_label = self.canvas.create_text(4, height - 4, anchor='sw', fill=space_blue, font=ampfont, text='')
+        self.span_label = self.canvas.create_text(width - 4, height - 4, anchor='se', fill=space_blue, font=ampfont, text='')
+        self.labels = {}
+
+    def set_label(self, item, text):
+        """Changes text of a label item, only if it changed."""
+        if not self.labels.get(item) == text:
+            self.canvas.itemconfigure(item, text=text)
+            self.labels[item] = text
+
+    def draw(self, now, span):
+        """Draws the last span seconds of history up to now."""
+        start = now - span
+        (time, value) = self.history.since(start)
+        plot_width = self.width - TrendPlot.margin
+
+        (x, y) = decimate_minmax(time, value, start, now, plot_width)
+
+        if len(x) < 2:
+            self.canvas.coords(self.line, 0, 0, 0, 0)
+            return
+
+        low = float(y.min())
+        high = float(y.max())
+        if high - low < 1e-15:
+            (low, high) = (low - abs(low) * 0.05 - 1e-15, high + abs(high) * 0.05 + 1e-15)
+
+        points = np.empty(2 * len(x))
+        points[0::2] = x + TrendPlot.margin
+        points[1::2] = (self.height - 10) - (y - low) / (high - low) * (self.height - 20)
+
+        self.canvas.coords(self.line, *points.tolist())  # updates the existing line
+        self.set_label(self.top_label, format_value(high))
+        self.set_label(self.bottom_label, format_value(low))
+        self.set_label(self.span_label, f'last {span // 60:.0f} min' if span >= 60 else f'last {span:.0f} s')
@@ -1,43 +1,353 @@
-import subprocess
-from os.path import dirname, abspath
+"""Updates of the app.
+
+Layout of a staged installation (base directory is the clone of the repository the app was installed from):
+    - <base>/releases/<commit>   (git worktree of a release, checked out and smoke-tested before it is used)
+    - <base>/current             (symbolic link to the release that runs, replaced atomically)
+    - <base>/previous            (symbolic link to the release to roll back to)
+    - <base>/pending             (release on trial until it reaches its first measurement)
+
+launcher.sh starts supervise(), which runs main.py of the current release and rolls back if an updated release does not reach
+its first measurement in time. Before the first update the app runs from the base directory.
+
+Usage: python3 updateService.py supervise
+"""
+
+import argparse
 import os
+import subprocess
+import sys
+from os.path import dirname, abspath, join, getmtime, realpath, islink, isdir, exists
+import threading
 import time
 
-def is_branch_behind():
-    
+import journal
+
+app_directory = dirname(abspath(__file__))
+
+RESTART = 3  # exit code of the app that makes the supervisor start the current release again
+
+
+def run_git(args, repo_dir=None, timeout=10.):
+    """Runs a git command in repo_dir (app directory by default). Returns its output as string.
+
+    Raises subprocess.CalledProcessError, subprocess.TimeoutExpired or OSError (git not installed)."""
+    output = subprocess.check_output(['git', *args],
+                                     cwd=repo_dir or app_directory,
+                                     stderr=subprocess.STDOUT,
+                                     stdin=subprocess.DEVNULL,
+                                     timeout=timeout)
+    return output.decode('utf-8')
+
+
+def base_directory(repo_dir=None, timeout=10.):
+    """Returns the base directory (clone the app was installed from), also when called from a release worktree."""
+    common_dir = run_git(['rev-parse', '--git-common-dir'], repo_dir, timeout).strip()
+    return dirname(abspath(join(repo_dir or app_directory, common_dir)))
+
+
+def upstream_ref(base_dir, timeout=10.):
+    """Returns name of the remote branch the base directory follows, e.g. origin/master."""
+    return run_git(['rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{upstream}'], base_dir, timeout).strip()
+
+
+def last_fetch_age(repo_dir=None, timeout=10.):
+    """Returns time [s] since the last git fetch, None if the repository was never fetched."""
     try:
-        file_directory = dirname(abspath(__file__))
-        os.chdir(file_directory)
-        
-        output = subprocess.check_output(['git', 'fetch'])
+        fetch_head = run_git(['rev-parse', '--git-path', 'FETCH_HEAD'], repo_dir, timeout).strip()
+        return time.time() - getmtime(join(repo_dir or app_directory, fetch_head))
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError):
+        return None
 
-        # Run the git status command
-        output = subprocess.check_output(['git', 'status'])
-        
-        # Decode the output from bytes to string
-        decoded_output = output.decode("utf-8")
 
-        # Check if the output contains the phrase indicating the branch is behind
-        if "Your branch is behind" in decoded_output:
-            return True
-        else:
+def is_branch_behind(repo_dir=None, timeout=10., fetch_interval=0.):
+    """Checks if the remote branch has commits that are not in the running version.
+
+    Fetches from the remote unless the last fetch is younger than fetch_interval [s]. If the fetch fails or takes longer than
+    timeout [s] (no network), the last fetched state of the remote is compared instead.
+    """
+    try:
+        base_dir = base_directory(repo_dir, timeout)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        print("An error occurred while executing git command:", e)
+        return False
+
+    age = last_fetch_age(base_dir, timeout)
+    if age is None or age >= fetch_interval:
+        try:
+            run_git(['fetch'], base_dir, timeout)
+        except subprocess.TimeoutExpired:
+            print(f'git fetch took longer than {timeout} s, last fetched state is used.')
+        except subprocess.CalledProcessError as e:
+            print("An error occurred while executing git fetch:", e.output.decode("utf-8"))
+        except OSError as e:
+            print("An error occurred while executing git command:", e)
             return False
+
+    try:
+        # number of commits of the remote branch that are not in the running version
+        behind = run_git(['rev-list', '--count', f'HEAD..{upstream_ref(base_dir, timeout)}'], repo_dir, timeout)
     except subprocess.CalledProcessError as e:
+        print("An error occurred while executing git command:", e.output.decode("utf-8"))
+        return False
+    except (subprocess.TimeoutExpired, OSError) as e:
         print("An error occurred while executing git command:", e)
         return False
 
-def git_pull():
+    return int(behind) > 0
+
+
+def smoke_test(release, timeout=120.):
+    """Compiles a staged release and runs its self-test against the simulated hardware (see simulator.py). Returns True if both pass."""
+    for command in (['-m', 'compileall', '-q', '.'], ['simulator.py', '--self-test']):
+        try:
+            subprocess.run([sys.executable, *command],
+                           cwd=release,
+                           check=True,
+                           stdin=subprocess.DEVNULL,
+                           stdout=subprocess.PIPE,
+                           stderr=subprocess.STDOUT,
+                           timeout=timeout)
+        except subprocess.CalledProcessError as e:
+            print(f'Smoke test of {release} failed:', e.output.decode("utf-8"))
+            return False
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f'Smoke test of {release} failed:', e)
+            return False
+
+    return True
+
+
+def stage_update(repo_dir=None, timeout=10., test_timeout=120.):
+    """Checks out the last fetched version of the remote branch into a new release worktree and smoke-tests it.
+
+    The running version is not changed. Returns directory of the release, None if it could not be staged or failed the test."""
     try:
-        # Run the git pull command
-        output = subprocess.check_output(['git', 'pull'], stderr=subprocess.STDOUT)
-        
-        # Decode the output from bytes to string
-        decoded_output = output.decode("utf-8")
-        print(decoded_output)
+        base_dir = base_directory(repo_dir, timeout)
+        commit = run_git(['rev-parse', upstream_ref(base_dir, timeout)], base_dir, timeout).strip()
+        release = join(base_dir, 'releases', commit[:12])
+
+        if release == current_release(base_dir):
+            print('Version', commit[:12], 'is already running.')
+            return None
+
+        if isdir(release):  # left by an earlier attempt
+            run_git(['worktree', 'remove', '--force', release], base_dir, timeout)
+        run_git(['worktree', 'prune'], base_dir, timeout)
+        run_git(['worktree', 'add', '--detach', release, commit], base_dir, timeout)
 
     except subprocess.CalledProcessError as e:
-        # If an error occurs, print the output and return False
-        print("An error occurred while executing git pull:", e.output.decode("utf-8"))
-        return False
+        print("An error occurred while staging the update:", e.output.decode("utf-8"))
+        return None
+    except (subprocess.TimeoutExpired, OSError) as e:
+        print("An error occurred while staging the update:", e)
+        return None
 
-    return True
+    if not smoke_test(release, test_timeout):
+        remove_release(base_dir, release)
+        return None
+
+    return release
+
+
+def remove_release(base_dir, release, timeout=10.):
+    try:
+        run_git(['worktree', 'remove', '--force', release], base_dir, timeout)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        print(f'Release {release} could not be removed:', e)
+
+
+def replace_link(link, target):
+    """Points a symbolic link to target. The link is replaced atomically, it always points to the old or to the new target."""
+    temp = link + '.new'
+    if islink(temp) or exists(temp):
+        os.remove(temp)
+    os.symlink(target, temp)
+    os.replace(temp, link)
+
+
+def current_release(base_dir):
+    """Returns directory of the release that runs: target of the current link, base directory before the first update."""
+    link = join(base_dir, 'current')
+    return realpath(link) if islink(link) else base_dir
+
+
+def pending_release(base_dir):
+    """Returns directory of the release on trial, None if there is none."""
+    try:
+        with open(join(base_dir, 'pending'), 'r') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def activate_release(base_dir, release):
+    """Switches to a staged release, it starts with the next start of the app. Release is on trial until its first measurement."""
+    replace_link(join(base_dir, 'previous'), current_release(base_dir))
+    with open(join(base_dir, 'pending'), 'w') as file:
+        file.write(release)
+    replace_link(join(base_dir, 'current'), release)
+    journal.sync_directory(base_dir)
+
+
+def confirm_release(base_dir):
+    """Ends the trial of the current release. Releases other than the current and the previous one are removed."""
+    try:
+        os.remove(join(base_dir, 'pending'))
+    except OSError:
+        pass
+
+    # paths are compared resolved, the releases directory may be reached through a link
+    keep = (realpath(current_release(base_dir)), realpath(join(base_dir, 'previous')))
+    releases_dir = join(base_dir, 'releases')
+    if isdir(releases_dir):
+        for name in os.listdir(releases_dir):
+            if realpath(join(releases_dir, name)) not in keep:
+                remove_release(base_dir, join(releases_dir, name))
+
+
+def rollback(base_dir):
+    """Switches back to the previous release."""
+    previous = join(base_dir, 'previous')
+    if islink(previous):
+        replace_link(join(base_dir, 'current'), realpath(previous))
+    try:
+        os.remove(join(base_dir, 'pending'))
+    except OSError:
+        pass
+    journal.sync_directory(base_dir)
+
+
+def is_supervised():
+    """Returns True if the app was started by supervise()."""
+    return 'POWERMETER_MARKER' in os.environ
+
+
+def report_first_measurement():
+    """Tells the supervisor that the app runs and measures. Does nothing if the app was not started by supervise()."""
+    if is_supervised():
+        try:
+            open(os.environ['POWERMETER_MARKER'], 'w').close()
+        except OSError as e:
+            print('An error occurred while reporting first measurement:', e)
+
+
+def stop_process(process, timeout=5.):
+    process.terminate()
+    try:
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def supervise(base_dir=None, deadline=120.):
+    """Runs main.py of the current release and starts it again when it exits with RESTART (after an update).
+
+    A release on trial that does not report its first measurement within deadline [s] is stopped and the previous release is
+    started instead. State of the app (see settings.data_path) is kept in the base directory for all releases.
+    Returns when the app exits normally (Exit button)."""
+    base_dir = base_dir or app_directory
+    marker = join(base_dir, 'first_measurement')
+    env = dict(os.environ, POWERMETER_DATA=base_dir, POWERMETER_MARKER=marker)
+
+    while True:
+        release = current_release(base_dir)
+        on_trial = pending_release(base_dir) == release
+        if exists(marker):
+            os.remove(marker)
+
+        process = subprocess.Popen([sys.executable, 'main.py'], cwd=release, env=env)
+
+        if on_trial:
+            started = time.monotonic()
+            while process.poll() is None and not exists(marker) and time.monotonic() - started < deadline:
+                time.sleep(0.5)
+
+            if exists(marker):
+                print(f'Release {release} reached its first measurement.')
+                confirm_release(base_dir)
+            else:
+                print(f'Release {release} did not reach its first measurement in {deadline} s, rolling back.')
+                stop_process(process)
+                rollback(base_dir)
+                continue
+
+        code = process.wait()
+        if code == RESTART:
+            continue
+        if code == 0:
+            return
+        print(f'App stopped with exit code {code}, starting it again.')
+        time.sleep(2.)
+
+
+class UpdateChecker:
+    """UpdateChecker class.
+
+    Runs is_branch_behind() and stage_update() in a background thread, so a slow or missing network or a long smoke test never
+    blocks the app. Result of the check is kept in behind: None while the check runs, then True or False. The last result and its
+    time stay available for later checks. Staged release is kept in release, the base directory it belongs to in base_dir.
+
+    Constructor takes: repository directory (optional, app directory by default), timeout of git commands [s],
+    fetch interval [s] (remote is not fetched again if the last fetch is younger), timeout of the smoke test [s].
+
+    Example: checker = UpdateChecker()
+             checker.start()
+             ...
+             if checker.behind:
+                 checker.stage()
+    """
+
+    def __init__(self, repo_dir=None, timeout=10., fetch_interval=0., test_timeout=120.):
+        self.repo_dir = repo_dir
+        self.timeout = timeout
+        self.fetch_interval = fetch_interval
+        self.test_timeout = test_timeout
+        self.behind = None  # result of the last check, None until a check is finished
+        self.checked = None  # time.time() of the last finished check
+        self.release = None  # directory of the staged release, None if staging failed
+        self.base_dir = None  # base directory of the staged release, see activate_release
+        self._thread = None
+
+    def start(self):
+        """Starts a check in the background, unless the checker is busy."""
+        self._start(self._run, 'update check')
+
+    def stage(self):
+        """Stages the new version in the background, unless the checker is busy."""
+        self._start(self._stage, 'update staging')
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _start(self, target, name):
+        if not self.is_running():
+            self._thread = threading.Thread(target=target, name=name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        behind = is_branch_behind(self.repo_dir, self.timeout, self.fetch_interval)
+        self.checked = time.time()
+        self.behind = behind
+
+    def _stage(self):
+        self.release = None
+        release = stage_update(self.repo_dir, self.timeout, self.test_timeout)
+        if release is None:
+            return
+        try:
+            self.base_dir = base_directory(self.repo_dir, self.timeout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            print('An error occurred while staging the update:', e)
+            return
+        self.release = release  # set last, the GUI reads base_dir once release is set
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Powermeter updates.')
+    parser.add_argument('command', choices=['supervise'], help='supervise: run the app from the current release, roll back failed updates')
+    args = parser.parse_args()
+
+    import settings
+    deadline = settings.load_config(join(app_directory, 'config.yaml'))['update']['first measurement deadline']
+    supervise(app_directory, deadline)
@@ -0,0 +1,173 @@
+import os
+import hashlib
+import subprocess
+import threading
+
+
+def find_usb_path():
+    """Returns a path to the first mounted USB drive or empty string if there is none."""
+    try:
+        getname = subprocess.check_output(['whoami'])
+        name = getname.decode("utf-8")
+        path_to_usb = f'/media/{name[:-1]}/'
+        dirs = os.listdir(path_to_usb)
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+    if not dirs == []:
+        return f'{path_to_usb}' + f'{dirs[0]}/'
+    return ''
+
+
+class UsbSync:
+    """USB sync worker.
+
+    Copies completed spool segments of sessionLogger.SessionLogger to the USB drive in a background thread.
+    Each segment is copied in large sequential writes to a temporary file, flushed to the drive, read back and verified with a SHA-256 checksum.
+    Only then it is renamed to its final name and removed from the spool.
+
+    If the drive is missing, full or pulled mid-copy, the segment stays in the spool and is copied again once a drive is available.
+    The segment being copied is claimed in the logger, so a full spool never drops it meanwhile (see SessionLogger.claim_segment).
+
+    Constructor takes: SessionLogger, retry interval in seconds.
+
+    Example: sync = UsbSync(logger, 5)
+             request = sync.request_sync()  # e.g. before the drive is ejected
+             ...
+             if sync.is_synced(request): ...
+    """
+
+    chunk_size = 2**20  # bytes per write
+
+    def __init__(self, logger, retry_interval=5.):
+        self.logger = logger
+        self.retry_interval = retry_interval
+        self.usb_path = ''
+        self.synced_segments = 0
+        self.failed_copies = 0
+
+        self._wake = threading.Event()
+        self._requests = 0  # number of sync requests, see request_sync()
+        self._done = 0  # last request the worker finished
+        self._stop = False
+        self._lock = threading.Lock()
+
+        self.logger.on_segment_complete = lambda path: self._wake.set()
+
+        self._worker = threading.Thread(target=self._run, name='usb-sync', daemon=True)
+        self._worker.start()
+
+    def request_sync(self):
+        """Wakes the worker to copy all completed segments, including the one of a session stopped just before. Never blocks.
+
+        Returns the request, pass it to is_synced() to poll for completion (e.g. with Tk after())."""
+        self._requests += 1
+        request = self._requests
+        self._wake.set()
+        return request
+
+    def is_synced(self, request):
+        """Returns True once the worker finished a sync pass for request. Spool may still hold segments, see pending()."""
+        return self._done >= request
+
+    def pending(self):
+        """Returns number of completed segments waiting to be copied."""
+        return len(self.logger.list_completed_segments())
+
+    def stop(self):
+        self._stop = True
+        self._wake.set()
+        self._worker.join(2.)
+
+    def _run(self):
+        while not self._stop:
+            request = self._requests
+            if request > self._done:
+                self.logger.flush(self.retry_interval)  # queued rows and a stopped session are written to the spool first
+            self.sync_once()
+            self._done = request
+
+            self._wake.clear()
+            if self._requests == self._done:  # a request that came meanwhile is handled right away
+                self._wake.wait(self.retry_interval)
+
+    def sync_once(self):
+        """Copies all completed segments to the USB drive. Returns number of copied segments."""
+        with self._lock:
+            segments = self.logger.list_completed_segments()
+            if segments == []:
+                return 0
+
+            self.usb_path = find_usb_path()
+            if self.usb_path == '':
+                return 0
+
+            copied = 0
+            for segment in segments:
+                if self._stop:
+                    break
+                if not self.logger.claim_segment(segment):
+                    continue  # dropped meanwhile, spool was full
+                try:
+                    copied_segment = self.copy_segment(segment)
+                finally:
+                    self.logger.release_segment()
+                if not copied_segment:
+                    self.failed_copies += 1
+                    break  # drive is probably gone, retry later
+                copied += 1
+                self.synced_segments += 1
+
+            return copied
+
+    def copy_segment(self, segment):
+        """Copies one segment to USB drive and verifies it. Returns True on success."""
+        session = os.path.basename(os.path.dirname(segment))
+        target_dir = os.path.join(self.usb_path, session)
+        target = os.path.join(target_dir, os.path.basename(segment))
+        temp = target + '.tmp'
+
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            checksum = hashlib.sha256()
+
+            with open(segment, 'rb') as src, open(temp, 'wb') as dst:
+                while True:
+                    chunk = src.read(UsbSync.chunk_size)
+                    if not chunk:
+                        break
+                    checksum.update(chunk)
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+                # drop cached pages so the verification reads from the drive
+                os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+            if not self.file_checksum(temp) == checksum.hexdigest():
+                print('Checksum mismatch while copying segment to USB:', segment)
+                os.remove(temp)
+                return False
+
+            os.replace(temp, target)
+            os.remove(segment)
+
+            session_dir = os.path.dirname(segment)
+            if not session == self.logger.session and os.listdir(session_dir) == []:
+                os.rmdir(session_dir)
+
+        except OSError as e:
+            print('An error occurred while copying segment to USB:', e)
+            return False
+
+        return True
+
+    def file_checksum(self, path):
+        """Returns SHA-256 checksum of a file."""
+        checksum = hashlib.sha256()
+        with open(path, 'rb') as file:
+            while True:
+                chunk = file.read(UsbSync.chunk_size)
+                if not chunk:
+                    break
+                checksum.update(chunk)
+        return checksum.hexdigest()
@@ -0,0 +1,38 @@
+class ViewModel:
+    """View model of the measurement screen.
+
+    Keeps the last rendered state of every widget and pushes only the fields that changed to Tk.
+    Each configure call is a round-trip to Tcl and may trigger a relayout, comparing values in Python is much cheaper.
+
+    Example: vm = ViewModel()
+             vm.set(output_label, text='1.234 mW')  # configures the label
+             vm.set(output_label, text='1.234 mW')  # does nothing
+    """
+
+    def __init__(self):
+        self.state = {}
+        self.configure_calls = 0
+
+    def set(self, widget, **fields):
+        """Configures changed fields of a widget. Returns True if anything was pushed to Tk."""
+        last = self.state.setdefault(widget, {})
+        changed = {}
+        for (field, value) in fields.items():
+            if not last.get(field) == value:
+                changed[field] = value
+
+        if changed == {}:
+            return False
+
+        widget.configure(**changed)
+        last.update(changed)
+        self.configure_calls += 1
+        return True
+
+    def forget(self, widget):
+        """Forgets the state of a widget, next set() configures it again."""
+        self.state.pop(widget, None)
+
+    def clear(self):
+        """Forgets all widgets. Used when widgets are destroyed."""
+        self.state = {}